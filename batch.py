@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+# file: batch.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Run many .machine files in parallel and collect the
+results into a single JSON or CSV report: the final
+registers, a hash of the memory, the line and cycle
+count where processing stopped and the program output
+(DSP lines and messages).
+
+Each file can be given a list of inputs in a JSON file
+of the same name with the extension .inputs: a list of
+objects with optional "registers" (name: value) and
+"memory" (label or address: list of words) presets
+applied after loading. Each input is a separate run.
+
+usage: batch.py [-c cfg] [-b backend] [-j jobs] [-o report] files
+"""
+
+# standard modules
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha1
+from io import StringIO
+from os import cpu_count, path
+import json, csv
+
+# local classes and functions
+from logsink import sink
+
+# engine backends (see machine.py)
+BACKENDS = {
+    "interpreter" : ("engine__004", "engine"),
+    "compiler"    : ("compiler", "compiler"),
+    "tracejit"    : ("tracejit", "tracejit"),
+    }
+
+# report columns
+FIELDS = ("file", "input", "end", "line", "cycles",
+    "memory", "registers", "output")
+
+# apply register and memory presets to a loaded engine
+def preset(E, I):
+    R, MM = E.S.R, E.S.MM
+    for r, v in I.get("registers", {}).items():
+        if r.upper() not in E.RI:
+            return f"unknown register '{r}'"
+        R[E.RI[r.upper()]] = v & E.MSK
+    for a, c in I.get("memory", {}).items():
+        if a.upper() in E.ml: a = E.ml[a.upper()]
+        elif a.isdigit(): a = int(a)
+        else: return f"unknown memory label '{a}'"
+        if a + len(c) > len(MM):
+            return f"memory preset out of range at {a}"
+        for i, v in enumerate(c): MM[a+i] = v & E.MSK
+        E.touched(a, len(c))
+    return None
+
+# memory hash (words are hashed as decimal text
+# when they are wider than a buffer item)
+def memhash(MM):
+    if isinstance(MM, list):
+        return sha1(",".join(map(str, MM)).encode()).hexdigest()
+    return sha1(memoryview(MM)).hexdigest()
+
+# run one program with one input (in a worker process)
+def run(fp, cfg, be, n, I):
+    m, c = BACKENDS[be]
+    engine = getattr(__import__(m), c)
+    # result
+    res = dict.fromkeys(FIELDS)
+    res.update({"file": fp, "input": n})
+    # program output is collected in memory
+    out = StringIO()
+    try:
+        ft = open(fp).read()
+        E = engine([], cfg, {'CONSOLE': -1, 'LOGLEVEL': -1})
+        E.LS[0].append(sink(out))
+        if not E.load(ft):
+            res["end"] = "load"
+        elif I and (e := preset(E, I)):
+            res["end"] = e
+        else:
+            E.processCode()
+            cm = E.CFG['CYCLEMAX']
+            res["end"] = "error"
+            if E.ip == len(E.il): res["end"] = "code"
+            if cm and E.cc > cm: res["end"] = "cycles"
+            res.update({
+                "line": E.ip, "cycles": E.cc,
+                "memory": memhash(E.S.MM),
+                "registers": dict(zip(E.RN, E.S.R)),
+                })
+    except Exception as e:
+        res["end"] = f"{type(e).__name__}: {e}"
+    res["output"] = out.getvalue()
+    return res
+
+# list of runs: (file, input number, input)
+def runs(files):
+    L = []
+    for fp in files:
+        fi = path.splitext(fp)[0] + ".inputs"
+        if not path.exists(fi):
+            L.append((fp, 0, None))
+            continue
+        for n, I in enumerate(json.load(open(fi))):
+            L.append((fp, n, I))
+    return L
+
+# run all programs and return the results in order
+def batch(files, cfg = "./engine.cfg", be = "interpreter", jobs = None):
+    L = runs(files)
+    with ProcessPoolExecutor(jobs or cpu_count()) as X:
+        F = [X.submit(run, fp, cfg, be, n, I) for fp, n, I in L]
+        return [f.result() for f in F]
+
+# write the report (the extension selects the format)
+def report(R, fn):
+    fh = open(fn, "w", newline = "") if fn else None
+    if fn and fn.endswith(".csv"):
+        w = csv.DictWriter(fh, FIELDS)
+        w.writeheader()
+        for r in R:
+            r = dict(r)
+            if r["registers"] is not None:
+                r["registers"] = " ".join(
+                    f"{k}={v}" for k, v in r["registers"].items())
+            w.writerow(r)
+    else:
+        s = json.dumps(R, indent = 1)
+        if fh: fh.write(s + "\n")
+        else: print(s)
+    if fh: fh.close()
+    return
+
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+
+    ap = ArgumentParser(description = __doc__.split("\n\n")[0])
+    ap.add_argument("files", nargs = "+")
+    ap.add_argument("-c", default = "./engine.cfg", help = "configuration")
+    ap.add_argument("-b", default = "interpreter", choices = BACKENDS)
+    ap.add_argument("-j", type = int, default = None, help = "processes")
+    ap.add_argument("-o", default = "", help = "report (.json or .csv)")
+    a = ap.parse_args()
+
+    report(batch(a.files, a.c, a.b, a.j), a.o)
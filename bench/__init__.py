@@ -0,0 +1,12 @@
+#!/usr/bin/python3
+# file: bench/__init__.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Engine benchmarks.
+
+run.py      cycles per second, load time and peak memory
+            of the programs in programs/ for each backend
+load.py     load time of a large generated program
+"""
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+# file: bench/load.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Load time benchmark: a program of about n lines is
+generated (labels, comments, memory allocations and
+every operand syntax) and loaded without cache.
+
+usage: load.py [n [repeat]]
+"""
+
+# standard modules
+from os import path
+from time import perf_counter
+import sys
+
+# local classes and functions
+sys.path.insert(0, path.join(path.dirname(__file__), ".."))
+from engine__004 import engine
+
+# one block of code (i is the block number)
+def block(i):
+    return f"""
+L{i}:   ################################### block {i}
+        xfr r1 0x{i & 0xFF:02X}       # hexadecimal
+        xfr r2 0b101            # binary
+        adc r1 r2
+        and r1 255
+        ior r1 D{i}+1
+        eor r1 L{i}$0
+        xfr [r1, r2] r3         # memory at register list
+        xfr r4 [r1]
+        shr r4
+        shl r4
+        dsp [D{i}]
+        jnz L{i}_
+        jze r7
+L{i}_:  nop
+D{i}:   mem 4 = 1, 2, -3, 0o7
+S{i}:   mem 8 = "block"
+"""
+
+# generated program of at least n lines
+def program(n):
+    L = ["#!./engine__004.py"]
+    i = 0
+    while len(L) < n:
+        L.extend(block(i).split("\n"))
+        i += 1
+    return "\n".join(L)
+
+if __name__ == "__main__":
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    s = program(n)
+    cfg = path.join(path.dirname(__file__), "..", "engine.cfg")
+    opt = {'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': '', 'BITS': 16}
+    T = []
+    for k in range(m):
+        E = engine([], cfg, opt)
+        t = perf_counter()
+        ok = E.load(s)
+        T.append(perf_counter() - t)
+    print(f"{len(E.il)-1} lines, loaded: {ok}")
+    print(f"best {min(T):.3f} s, mean {sum(T)/m:.3f} s")
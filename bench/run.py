@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+# file: bench/run.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Engine throughput benchmark. Each program of the
+programs directory is loaded and run to its end by
+each backend. The best of the repeated runs gives the
+load time and the simulated cycles per second; a run
+traced by tracemalloc gives the peak memory. Results
+are written as JSON and can be compared with the
+results of a previous engine version.
+
+usage: run.py [-b backend] [-p program] [-r repeat]
+              [-o results.json] [-c previous.json]
+"""
+
+# standard modules
+from os import path
+from time import perf_counter
+from datetime import datetime
+import sys, json, platform, tracemalloc
+
+# local classes and functions
+ROOT = path.join(path.dirname(path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+from batch import BACKENDS
+
+# programs and their configuration
+PROGRAMS = {
+    "count"     : {'BITS': 8},      # tight counting loops
+    "memcopy"   : {'BITS': 16},     # [r1] addressing
+    "pushpull"  : {'BITS': 8},      # stack routines, short calls
+    "wide"      : {'BITS': 128},    # wide words arithmetic
+    }
+
+# common configuration: silent, no cache, no cycles limit
+OPTIONS = {'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': '', 'CYCLEMAX': 0}
+
+# engine class of a backend
+def backend(be):
+    m, c = BACKENDS[be]
+    return getattr(__import__(m), c)
+
+# load and run a program once: engine, load and run times
+def once(E, p):
+    s = open(path.join(ROOT, "bench", "programs", f"{p}.machine")).read()
+    e = E([], path.join(ROOT, "engine.cfg"), dict(OPTIONS, **PROGRAMS[p]))
+    t0 = perf_counter()
+    ok = e.load(s)
+    t1 = perf_counter()
+    if ok: e.processCode()
+    t2 = perf_counter()
+    return e, t1 - t0, t2 - t1
+
+# benchmark one program with one backend
+def bench(be, p, n = 3, mem = True):
+    E = backend(be)
+    # timing
+    L, T = [], []
+    for i in range(n):
+        e, l, t = once(E, p)
+        L.append(l)
+        T.append(t)
+    r = {
+        "program": p, "backend": be,
+        "end": "code" if e.ip == len(e.il) else "error",
+        "cycles": e.cc,
+        "load": min(L), "run": min(T),
+        "cps": e.cc / min(T) if min(T) else 0,
+        }
+    # peak memory (separate run, tracemalloc is slow)
+    if mem:
+        tracemalloc.start()
+        once(E, p)
+        r["peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return r
+
+# compare results R with previous results P
+def compare(R, P):
+    Q = {(r["program"], r["backend"]): r for r in P["results"]}
+    print(f"\ncompared with version {P['version']} ({P['date']}):")
+    for r in R:
+        q = Q.get((r["program"], r["backend"]))
+        if q is None or not q["cps"]: continue
+        print(f" {r['program']:10} {r['backend']:12}" \
+            f" {r['cps']/q['cps']:6.2f} x cycles/s" \
+            f" {q['load']/max(r['load'], 1e-9):6.2f} x load")
+    return
+
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+
+    ap = ArgumentParser(description = __doc__.split("\n\n")[1])
+    ap.add_argument("-b", action = "append", choices = BACKENDS)
+    ap.add_argument("-p", action = "append", choices = PROGRAMS)
+    ap.add_argument("-r", type = int, default = 3, help = "repeat")
+    ap.add_argument("-o", default = "", help = "results file")
+    ap.add_argument("-c", default = "", help = "previous results")
+    ap.add_argument("--no-memory", action = "store_true")
+    a = ap.parse_args()
+
+    from engine__004 import engine
+    R = []
+    print(f"engine version {engine.CFG['VERSION']}")
+    print(f" {'program':10} {'backend':12} {'cycles':>8}" \
+        f" {'Mcycles/s':>10} {'load ms':>8} {'peak kB':>8}")
+    for p in a.p or PROGRAMS:
+        for be in a.b or BACKENDS:
+            r = bench(be, p, a.r, not a.no_memory)
+            R.append(r)
+            pk = f"{r['peak']/1024:8.0f}" if "peak" in r else f"{'':8}"
+            print(f" {p:10} {be:12} {r['cycles']:8}" \
+                f" {r['cps']/1e6:10.3f} {r['load']*1e3:8.2f} {pk}" \
+                + ("" if r["end"] == "code" else f" ({r['end']})"))
+    # results
+    res = {
+        "version": engine.CFG['VERSION'],
+        "date": datetime.now().isoformat(timespec = "seconds"),
+        "python": platform.python_version(),
+        "results": R,
+        }
+    if a.o:
+        with open(a.o, "w") as fh: json.dump(res, fh, indent = 1)
+    if a.c:
+        with open(a.c) as fh: compare(R, json.load(fh))
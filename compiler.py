@@ -0,0 +1,383 @@
+#!/usr/bin/python3
+# file: compiler.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+A compiling backend for the core engine. The
+decoded program of a loaded engine is translated
+into the source of a single python function: basic
+blocks become inline register and memory operations
+and jumps become a dispatch on the block number.
+The function is compiled once and produces the same
+registers, memory, STATUS flags, cycle count and DSP
+output as the interpreter.
+"""
+
+# local classes and functions
+from engine__004 import engine
+
+# status register formatting (see engine.statregfm)
+def flagfm(s):
+    return "".join(
+        f if s & w else "." for f, w in engine.FLAGS.items())
+
+# python source generator
+
+class codegen():
+
+    """ Translate decoded instructions of a loaded engine
+    into python statements. Registers are local variables
+    named R_<name>, the memory list is MM, the cycle count
+    is cc and the flags are computed into R_STATUS.
+    """
+
+    def __init__(self, E):
+        self.E = E
+        # constants
+        self.BITS = E.CFG['BITS']
+        self.CB, self.MSK, self.MSB = E.CB, E.MSK, E.MSB
+        self.AWM = E.AWM
+        return
+
+    # register local variable name
+    def reg(self, r):
+        return f"R_{r}"
+
+    # copy registers into local variables
+    def load(self, tab):
+        return [
+            f"{tab}{self.reg(r)} = R[{i}]"
+            for i, r in enumerate(self.E.RN)]
+
+    # copy local variables back into registers
+    def save(self, tab):
+        return [
+            f"{tab}R[{i}] = {self.reg(r)}"
+            for i, r in enumerate(self.E.RN)]
+
+    # compile source and return the function called name
+    def build(self, src, name, **ns):
+        ns.update({
+            "R": self.E.S.R, "MM": self.E.S.MM, "D": self.E.S.D,
+            "log": self.E.log, "usfm": self.E.usfm, "flagfm": flagfm,
+            })
+        exec(compile(src, f"<compiled {name}>", "exec"), ns)
+        return ns[name]
+
+    # register list value (first register is least significant)
+    def rls(self, R):
+        l = [self.reg(R[0])]
+        for i, r in enumerate(R[1:], 1):
+            l.append(f"{self.reg(r)}*{self.CB**i}")
+        if len(l) == 1: return l[0]
+        return f"({' + '.join(l)})"
+
+    # memory address
+    def adr(self, op):
+        if op[0] == "MEM":
+            return f"{self.rls(op[1])} & {self.AWM}"
+        a = op[1]
+        if a[0] == "IMM": return f"{a[1] & self.AWM}"
+        return f"{self.E.lblval(a)}"
+
+    # read operand
+    def rd(self, op):
+        k = op[0]
+        if k == "IMM": return f"{op[1]}"
+        if k == "LBL": return f"{self.E.lblval(op)}"
+        if k == "LIN": return f"{self.E.target(op[1])}"
+        if k == "REG": return self.reg(op[1])
+        if k == "RLS": return self.rls(op[1])
+        return f"MM[{self.adr(op)}]"
+
+    # write operand (memory words are BITS wide, the page
+    # written is marked, see engine.pages)
+    def wr(self, op, x):
+        if op[0] == "REG": return f"{self.reg(op[1])} = {x}"
+        s = self.E.PAGEBITS
+        if op[0] == "MEM": return \
+            f"a = {self.adr(op)}; MM[a] = {x} & {self.MSK}; D.add(a >> {s})"
+        a = int(self.adr(op))
+        return f"MM[{a}] = {x} & {self.MSK}; D.add({a >> s})"
+
+    # Z and N flags of z
+    def zn(self):
+        return f"(8 if z & {self.MSB} else 0) | (0 if z else 4)"
+
+    # DSP message
+    def dspfm(self, d, ip):
+        h = repr(f" {ip:04}  ") + ' + format(cc, "06") + "  "'
+        op = d.src
+        # register
+        if op[0] == "REG":
+            r = op[1]
+            if r == "STATUS":
+                return f"{h} + 'STATUS:' + flagfm({self.reg(r)})"
+            return f"{h} + '{r}:' + usfm({self.reg(r)})"
+        # memory at register list address
+        if op[0] == "MEM":
+            m = " + ', ' + ".join(
+                f"'{r}:' + str({self.reg(r)})" for r in op[1])
+            return f"{h} + '[' + {m} + ']:' + usfm({self.rd(op)})"
+        # memory at constant address
+        m = repr(f"{self.E.adrfm(op)}:")
+        return f"{h} + {m} + usfm({self.rd(op)})"
+
+    # statements of a non-jump instruction (without the
+    # flags when they are never read, see optimizer)
+    def emit(self, d, ip):
+        s = self.statements(d, ip)
+        if s and d.nf: s = [l for l in s if not l.startswith("R_STATUS")]
+        return s
+
+    # statements of a non-jump instruction
+    def statements(self, d, ip):
+        o, B, M = d.opc, self.BITS, self.MSK
+        if o == "NOC": return []
+        if o == "NOP": return ["cc += 1"]
+        if o == "DSP": return [f"log({self.dspfm(d, ip)})"]
+        if o == "XFR": return [
+            self.wr(d.dst, self.rd(d.src)),
+            "cc += 1"]
+        if o == "ADC": return [
+            f"x, y = {self.rd(d.dst)}, {self.rd(d.src)}",
+            f"z = x + y + (R_STATUS & 1)",
+            f"R_STATUS = R_STATUS & -16 " \
+            f"| (2 if (x ^ z) & (y ^ z) & {self.MSB} else 0) " \
+            f"| (z >> {B} & 1)",
+            f"z &= {M}",
+            f"R_STATUS |= {self.zn()}",
+            self.wr(d.dst, "z"),
+            "cc += 1"]
+        if o == "SHR": return [
+            f"x = {self.rd(d.dst)}",
+            f"z = (x >> 1) + ({self.MSB} if R_STATUS & 1 else 0)",
+            f"R_STATUS = R_STATUS & -14 | (x & 1) | {self.zn()}",
+            self.wr(d.dst, "z"),
+            "cc += 1"]
+        if o == "SHL": return [
+            f"x = {self.rd(d.dst)}",
+            f"z = (x << 1 & {M}) + (1 if R_STATUS & 1 else 0)",
+            f"R_STATUS = R_STATUS & -14 " \
+            f"| (1 if x & {self.MSB} else 0) | {self.zn()}",
+            self.wr(d.dst, "z"),
+            "cc += 1"]
+        if o in ("AND", "IOR", "EOR"):
+            f = {"AND": "&", "IOR": "|", "EOR": "^"}[o]
+            return [
+                f"z = {self.rd(d.dst)} {f} {self.rd(d.src)}",
+                f"R_STATUS = R_STATUS & -13 | {self.zn()}",
+                self.wr(d.dst, "z"),
+                "cc += 1"]
+        return None
+
+# the compiled engine
+
+class compiler(engine):
+
+    """ An engine whose processCode runs the program as
+    compiled python. Lines the compiled code cannot run
+    (MEM lines, arguments that failed to decode, dynamic
+    jumps to lines that do not start a block) are handed
+    over to the interpreter, as is the whole program when
+    a trace or a profile is requested (see engine.interpreted).
+    """
+
+    # first lines of the basic blocks
+    def leaders(self):
+        n, L = len(self.dl), {0}
+        # labels are possible targets (their values for the
+        # register jumps, their first executable lines for the
+        # label jumps)
+        L.update(self.ll.values())
+        L.update(self.target(l) for l in self.ll)
+        # lines following a jump or an interpreter exit, jumps
+        # to a known line (see optimizer)
+        for d in self.dl:
+            if d.opc in ("JMP", "JNZ", "JZE") \
+                or d.opc == "MEM" or d.fn is engine.opERR:
+                L.add(d.nx)
+            if d.opc in ("JMP", "JNZ", "JZE") and d.dst is not None \
+                and d.dst[0] == "IMM":
+                L.add(d.dst[1])
+        # linked units (the code ends with the last line of
+        # a unit)
+        L.update(l+1 for l in self.EL)
+        return sorted(l for l in L if l < n)
+
+    # python source of the program (with the cycles limit
+    # checks when lim is set)
+    def generate(self, lim):
+        # code generator and blocks
+        cg, L = codegen(self), self.leaders()
+        n, cm, BL = len(self.dl), lim, {}
+        for i, l in enumerate(L): BL[l] = i
+        # source lines
+        S = []
+        # exit the loop at line x
+        def exit(x, tab):
+            S.append(f"{tab}ip = {x}")
+            S.append(f"{tab}break")
+        # go to line x
+        def goto(x, tab):
+            if x in BL: S.append(f"{tab}b = {BL[x]}")
+            else: exit(x, tab)
+        # count one cycle and check the limit (x is the next line)
+        def cycle(x, tab):
+            if cm: S.append(f"{tab}if cc > cm: ip = {x}; break")
+        # block code
+        def block(k, tab):
+            i, e = L[k], L[k+1] if k+1 < len(L) else n
+            for j in range(i, e):
+                d = self.dl[j]
+                # interpreter exit
+                if d.opc == "MEM" or d.fn is engine.opERR:
+                    exit(j, tab)
+                    return
+                # jumps
+                if d.opc in ("JMP", "JNZ", "JZE"):
+                    S.append(f"{tab}cc += 1")
+                    # jump target
+                    if d.dst[0] == "LIN":
+                        t = self.target(d.dst[1])
+                    elif d.dst[0] == "IMM" and d.dst[1] < n:
+                        t = d.dst[1]
+                    else:
+                        t = None
+                        S.append(f"{tab}t = {cg.rd(d.dst)}")
+                    # condition
+                    T = tab
+                    if d.opc != "JMP":
+                        c = ["", "not "][d.opc == "JNZ"]
+                        S.append(f"{tab}if {c}R_STATUS & 4:")
+                        T = tab + "    "
+                    # jump
+                    if t is None:
+                        if cm: S.append(f"{T}if cc > cm: ip = t; break")
+                        S.append(f"{T}b = BL.get(t)")
+                        S.append(f"{T}if b is None: ip = t; break")
+                    else:
+                        cycle(t, T)
+                        goto(t, T)
+                    # continue
+                    if d.opc != "JMP":
+                        S.append(f"{tab}else:")
+                        cycle(d.nx, T)
+                        goto(d.nx, T)
+                    return
+                # straight code
+                s = cg.emit(d, j)
+                for l in s: S.append(f"{tab}{l}")
+                if "cc += 1" in s: cycle(d.nx, tab)
+            # fall through (or end of code)
+            goto(n if e-1 in self.EL else e, tab)
+            return
+        # dispatch on block number (binary tree)
+        def tree(lo, hi, tab):
+            if hi - lo == 1:
+                block(lo, tab)
+                return
+            m = (lo + hi) // 2
+            S.append(f"{tab}if b < {m}:")
+            tree(lo, m, tab + "    ")
+            S.append(f"{tab}else:")
+            tree(m, hi, tab + "    ")
+            return
+        # function header: load registers
+        S.append("def run(ip, cc, cm):")
+        S.extend(cg.load("    "))
+        S.append("    b = BL[ip]")
+        S.append("    while True:")
+        tree(0, len(L), " "*8)
+        # save registers
+        S.extend(cg.save("    "))
+        S.append("    return ip, cc")
+        # done
+        return "\n".join(S) + "\n", BL
+
+    # compile the program into a function run(ip, cc, cm)
+    # returning the line and cycle count where it stopped
+    # and the first lines of its blocks
+    def compileCode(self, lim):
+        src, BL = self.generate(lim)
+        return codegen(self).build(src, "run", BL = BL), BL
+
+    # compiled programs with and without cycles limit (kept
+    # across reset)
+    CF = None
+
+    # run the compiled program
+    def processCode(self):
+        # traces and profiles need the interpreter
+        if self.interpreted():
+            return engine.processCode(self)
+        # formats
+        t = f"{'':2}"
+        # display
+        self.info(f"\nstart processing:")
+        self.info(f" line{t}cycles{t}instruction")
+        self.info(f" ----{t}------{t}-----------")
+        self.processLines(0, 0)
+        # done
+        return
+
+    # process lines from line ip and cycle count cc: blocks
+    # are run by the compiled program and the other lines
+    # by the interpreter until the next block
+    def processLines(self, ip, cc):
+        # traces and profiles need the interpreter
+        if self.interpreted():
+            return engine.processLines(self, ip, cc)
+        # release handlers (no opcode debug flag is set)
+        self.dispatch()
+        # cycles limit
+        cm = self.cyclemax()
+        # compile once
+        if self.CF is None: self.CF = {}
+        if bool(cm) not in self.CF:
+            self.CF[bool(cm)] = self.compileCode(bool(cm))
+        run, BL = self.CF[bool(cm)]
+        # success
+        r = True
+        # decoded instructions, end of code
+        dl, n = self.dl, len(self.il)
+        # while successfull, continue processing (the compiled
+        # code stops on a line it can not run: the next line is
+        # always interpreted)
+        c = False
+        while r:
+            if ip in BL and not c:
+                # run compiled code (flags are not lazy there)
+                self.flush()
+                ip, cc = run(ip, cc, cm)
+                c = True
+            else:
+                c = False
+                d = dl[ip]
+                # execute and display (the header is formatted
+                # by the handlers that display)
+                r, ip, cc = d.fn(self, d, ip, cc)
+                # interupt on failure
+                if not r:
+                    self.log(f"error while running code at line {ip-1}.")
+                    self.log(f"exiting...")
+                    self.flush()
+                    self.ip, self.cc = ip-1, cc
+                    return
+            # break on last instruction
+            if ip == n:
+                self.log(f"\nreached end of code.")
+                r = False
+            # break on limit reached
+            if cm:
+                if cc > cm:
+                    if cm == self.CFG['CYCLEMAX']:
+                        self.log(f"\n\nreached end of cycles.")
+                    r = False
+        # write pending flags
+        self.flush()
+        # stop position
+        self.ip, self.cc = ip, cc
+        # done
+        return
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+# file: debugger.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Interactive debugger. The program stops on the
+breakpoints and watchpoints given on the command line
+(lines or labels with -b, registers, memory labels or
+addresses with -w) and commands read from the input
+inspect the machine state. The commands can be piped
+in for a scripted session.
+
+commands:
+    c               continue
+    s               step one line
+    r               registers
+    m x [n]         memory from label or address x
+    l               current line
+    b x, w x, d x   add breakpoint, watchpoint, delete
+    q               quit
+
+usage: debugger.py [-c cfg] [-b line] [-w what] file
+"""
+
+# standard modules
+from sys import stdin
+
+# local classes and functions
+from engine__004 import engine
+
+# line or address argument: a number or a name
+def where(x):
+    return int(x, 0) if x[0].isdigit() else x
+
+# print n memory words from label or address x
+def memory(E, x, n):
+    MM = E.S.MM
+    if isinstance(x, str):
+        if not x.upper() in E.ml.keys():
+            print(f"unknown memory label '{x}'")
+            return
+        x, n = E.ml[x.upper()], n or E.mz[x.upper()]
+    for a in range(x, min(x + (n or 1), len(MM))):
+        print(f" {a:06}  {E.usfm(MM[a])}")
+    return
+
+# stop hook: read commands until the program continues
+def console(E):
+    E.SS = False
+    print(f" {E.ip:04}  {E.cc:06}  {E.il[E.ip] if E.ip < len(E.il) else ''}")
+    while True:
+        l = stdin.readline()
+        # end of input: let the program run to its end
+        if not l: E.clear(); return True
+        c, *a = l.split() or [""]
+        if c == "c": return True
+        if c == "s": E.SS = True; return True
+        if c == "q": return False
+        if c == "r":
+            print("  ".join(f"{r}:{E.usfm(v)}" for r, v in zip(E.RN, E.S.R)))
+        elif c == "l":
+            print(f" {E.ip:04}  {E.il[E.ip] if E.ip < len(E.il) else ''}")
+        elif c == "m" and a:
+            memory(E, where(a[0]), int(a[1], 0) if len(a) > 1 else 0)
+        elif c == "b" and a: E.breakpoint(where(a[0]))
+        elif c == "w" and a: E.watchpoint(where(a[0]))
+        elif c == "d" and a: E.clear(where(a[0]))
+        elif c: print(f"unknown command '{l.strip()}'")
+
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+
+    ap = ArgumentParser(description = __doc__.split("\n\n")[0])
+    ap.add_argument("file")
+    ap.add_argument("-c", default = "./engine.cfg", help = "configuration")
+    ap.add_argument("-b", action = "append", default = [], help = "breakpoint")
+    ap.add_argument("-w", action = "append", default = [], help = "watchpoint")
+    a = ap.parse_args()
+
+    E = engine([], a.c)
+    if E.load(open(a.file).read()):
+        for x in a.b: E.breakpoint(where(x))
+        for x in a.w: E.watchpoint(where(x))
+        # without any, stop on the first line
+        if not (E.BP or E.WP): E.SS = True
+        E.onbreak = console
+        E.processCode()
@@ -15,10 +15,23 @@ with a standard static RAM.
 """
 
 # standard modules
-from sys import argv
+from sys import argv, byteorder
 from datetime import date
+from time import perf_counter_ns
+from array import array
+import re, gc
+from weakref import finalize
+from hashlib import sha1
+from os import path, makedirs, replace, getpid, stat
+from mmap import mmap, ACCESS_READ
+import pickle, zlib
 
 # local classes and functions
+from logsink import sink, writer, console
+from tracefile import recorder
+from profiler import report
+from ioport import ioport, starved
+from optimizer import optimize
 
 class config():
 
@@ -58,33 +71,35 @@ def setDebugOtpions(dico, opts):
             dico[o] = True
     return
 
+# precompiled lexical patterns: the scanners below
+# match at a position of a line instead of walking it
+# one character at a time
+
+DIGITS = {
+    2 : re.compile("[01]+"),
+    8 : re.compile("[0-7]+"),
+    10: re.compile("[0-9]+"),
+    16: re.compile("[0-9A-Fa-f]+"),
+    }
+
+IDENT = re.compile("[A-Za-z_][A-Za-z0-9_]*")
+SPACES = re.compile("[ \t]*")
+STRING = re.compile('"[^"\0]*"')
+
+# a line: optional label, opcode, spaces up to the arguments
+LINE = re.compile(
+    "[ \t]*(?:([A-Za-z_][A-Za-z0-9_]*):)?[ \t]*"
+    "(?:([A-Za-z_][A-Za-z0-9_]*)[ \t]*)?")
+
 # convert a character string
 # to an integer value (no checks)
 def strtoint(bs, base = 10):
-    conversionTable = {
-        '0':0,  '1':1,  '2':2,  '3':3,
-        '4':4,  '5':5,  '6':6,  '7':7,
-        '8':8,  '9':9,  'A':10, 'B':11,
-        'C':12, 'D':13, 'E':14, 'F':15,
-        }
-    v, n = 0, len(bs)
-    for i in range(n):
-        v *= base 
-        I = bs[i].upper()
-        v += conversionTable[I]
-    return v
+    return int(bs, base)
  
 # parse an unsigned integer number
 def getuint(bs, p, base = 10):
-    charSets = {
-        2 :"01",
-        8 :"01234567",
-        10:"0123456789",
-        16:"0123456789ABCDEF",
-        }
-    n = p
-    while bs[n].upper() in charSets[base]: n += 1
-    if n > p: return strtoint(bs[p:n], base), n
+    m = DIGITS[base].match(bs, p)
+    if m: return int(m.group(), base), m.end()
     return None, p
  
 # get a single sign symbol
@@ -114,22 +129,14 @@ def getInt(bs, p):
     b, cc, o = 10, bs[n:n+2].upper(), 0
     if cc in prefixSet: b, o = prefixSet[cc], 2
     v, m = getuint(bs, n+o, b)
+    if v is None: return None, p
     if s: return -v, m
     return v, m
 
 # get an alphanumeric sequence
 def getId(bs, p):
-    # define characters sets
-    A = "ABCDEFGHIJKLMNOPQRSTUVWXYZ_"
-    AN = A + "0123456789"
-    # record start
-    n = p
-    # filter first character
-    if not bs[n].upper() in A: return None, p
-    # filter next charcters
-    while bs[n].upper() in AN: n += 1
-    # check for al least one valid char
-    if n > p: return bs[p:n].upper(), n
+    m = IDENT.match(bs, p)
+    if m: return m.group().upper(), m.end()
     # no valid characters found (not an Id)
     return None, p
 
@@ -137,16 +144,11 @@ def getId(bs, p):
 # a hash character skips to the end of the string
 # returns False if no space character is found
 def skipSpaces(bs, p):
-    S = " " + "\t"
-    n = p
-    # skip spaces
-    while bs[n] in S: n += 1
+    n = SPACES.match(bs, p).end()
     # check for comment
     if bs[n] == "#": return True, len(bs)-1
-    # return valid spaces
-    if n > p: return True, n
-    # no valid space found
-    return False, p
+    # valid spaces found or not
+    return n > p, n
 
 # skip spaces and check for end-of-string
 def EndOfString(bs, p):
@@ -162,16 +164,11 @@ def getLabel(bs, p):
     return None, p
 
 def getString(s, p):
-    # check for opening quote
-    if not s[p] == '"': return None, p
-    # reach next char
-    n = p+1
-    # loop until closing quote
-    while not s[n] in ['"','\0']: n += 1
-    # no quote found
-    if not s[n] == '"': return None, p
+    # quoted characters up to the end-of-string
+    m = STRING.match(s, p)
+    if m is None: return None, p
     # found valid string
-    return s[p+1:n], n+1
+    return s[p+1:m.end()-1], m.end()
 
 def getintlist(s, p):
     # setup loop
@@ -216,6 +213,99 @@ def getidlist(s, p):
     # done
     return c, n
 
+# decoded instruction
+
+class instruction():
+
+    """ One line of code decoded during load: the opcode
+    name, its handler, its arguments, its operands and
+    the next line pointer. The processor runs from a list
+    of these and never parses the source text again.
+    """
+
+    __slots__ = (
+        'opc', 'fn', 'args', 'nx',  # decoded line
+        'dst', 'src',               # operands
+        'rx', 'rd', 'wr',           # operands access
+        'nf',                       # flags not needed
+        )
+
+    def __init__(self, opc, fn, args, nx):
+        self.opc, self.fn, self.args, self.nx = opc, fn, args, nx
+        self.dst, self.src = None, None
+        self.rx, self.rd, self.wr = None, None, None
+        self.nf = False
+        return
+
+# typed memory storage for words of the given width:
+# a bytearray up to 8 bits, the smallest array type up
+# to 64 bits and a list of integers for wider words
+def memorytype(bits):
+    if bits <= 8: return bytearray()
+    for t in "HILQ":
+        if array(t).itemsize*8 >= bits: return array(t)
+    return []
+
+# flush and close log sinks
+def closeLog(L):
+    for h in L: h.close()
+    return
+
+# hash of the source file fp
+def sourcehash(fp):
+    with open(fp, 'rb') as fh: return sha1(fh.read()).hexdigest()
+
+# machine state
+
+class state():
+
+    """ The state of one machine: the register file,
+    a fixed list of integers indexed by the register
+    number (STATUS, R0, then the extra registers in
+    the configuration order), the memory storage,
+    a typed buffer of BITS wide words, the flags
+    not yet written into STATUS (see engine.flush)
+    and the memory pages written since the last
+    snapshot (see engine.pages).
+    """
+
+    __slots__ = ('R', 'MM', 'F', 'D')
+
+    def __init__(self, n, bits):
+        self.R = [0]*n              # registers
+        self.MM = memorytype(bits)  # memory storage
+        self.F = None               # pending flags
+        self.D = set()              # pages written
+        return
+
+    # append n words of content c (zeros by default)
+    def extend(self, n, c = None):
+        MM = self.MM
+        if c is not None: MM.extend(c)
+        elif isinstance(MM, list): MM.extend([0]*n)
+        elif isinstance(MM, bytearray): MM.extend(bytes(n))
+        else: MM.frombytes(bytes(n*MM.itemsize))
+        return
+
+# machine state snapshot
+
+class snapshot():
+
+    """ A copy of the machine state: registers (STATUS
+    included), line and cycle count and the memory as a
+    list of pages. Pages are immutable (bytes, or tuples
+    of integers for words wider than 64 bits) and the
+    pages left unchanged since the previous snapshot are
+    shared with it.
+    """
+
+    __slots__ = ('bits', 'R', 'ip', 'cc', 'pages')
+
+    def __init__(self, bits, R, ip, cc, pages):
+        self.bits, self.R, self.ip, self.cc = bits, R, ip, cc
+        self.pages = pages
+        return
+
 # the main class
 
 class engine():
@@ -269,7 +359,17 @@ class engine():
         'BITS'      : 0,
         'LOGFILE'   : '',
         'CYCLEMAX'  : 0,
-        'REGS'      : ''
+        'REGS'      : '',
+        'CONSOLE'   : 2,
+        'LOGLEVEL'  : 2,
+        'LOGBUFFER' : 0,
+        'LOGTHREAD' : 0,
+        'TRACEFILE' : '',
+        'TRACEBUFFER' : 65536,
+        'CACHEDIR'  : '',
+        'PROFILE'   : '',
+        'PROFILETIME' : 0,
+        'OPTIMIZE'  : 0,
     }
 
 # ---- ---- ---- ---- constants
@@ -282,88 +382,187 @@ class engine():
 
     # constructor
     
-    def __init__(self, DEBUG = [], CONFIG = "./engine.cfg"):
+    def __init__(self, DEBUG = [], CONFIG = "./engine.cfg", OPTIONS = {}):
 
-        # setup debug options
+        # setup debug options (own copy of the defaults)
+        self.DBG = dict(self.DBG)
         setDebugOtpions(self.DBG, DEBUG)
 
-        # configure
+        # configure (own copy of the defaults)
+        self.CFG = dict(self.CFG)
         ch = config(self.CFG)
         ds = ch.parsefile(CONFIG)
-
-        # open log file
-        self.lh = open(self.CFG['LOGFILE'], 'w')
-        self.log(f'# file: {self.CFG["LOGFILE"]}')
-        self.log(f'# created: {date.today().strftime("%d %B %Y")}')
-        self.log(f'# author: {argv[0].split("/")[-1]}')
+        # overide configuration file parameters
+        for k, v in OPTIONS.items():
+            if k in self.CFG.keys():
+                ds += f'\nset {k} = {v}'
+                self.CFG[k] = v
+
+        # open log sinks
+        self.openLog()
+        self.info(f'# file: {self.CFG["LOGFILE"]}')
+        self.info(f'# created: {date.today().strftime("%d %B %Y")}')
+        self.info(f'# author: {argv[0].split("/")[-1]}')
 
         # log start up
-        self.log(f"\nengine version {self.CFG['VERSION']}")
+        self.info(f"\nengine version {self.CFG['VERSION']}")
 
         # delayed log of the configuration parameters
         if self.DBG['CONFIG']:
-            self.log(f"\nConfiguration:")
-            self.log(ds)
+            self.info(f"\nConfiguration:")
+            self.info(ds)
 
         # set constants
         self.CB = 1<<self.CFG['BITS']
         self.MSK, self.MSB = self.CB-1, self.CB>>1
 
-        # get extra registers
+        # get register names and numbers
+        self.RN = list(self.REGS)
         if self.CFG['REGS']:
             R, n = getidlist(self.CFG['REGS']+'\0', 0)
             for r in R:
-                if not r.upper() in self.REGS:
-                    self.REGS[r.upper()] = 0
+                if not r.upper() in self.RN:
+                    self.RN.append(r.upper())
+        self.RI = {r: i for i, r in enumerate(self.RN)}
+
+        # machine state
+        self.S = state(len(self.RN), self.CFG['BITS'])
+
+        # program
+        self.il = []    # instructions list
+        self.ll = {}    # labels list
+        self.ml = {}    # memory references
+        self.mz = {}    # memory sizes
+        self.dl = []    # decoded instructions list
+        self.M0 = None  # initial memory image
+        self.XF = []    # memory files read (name, size, time)
+        self.EL = set() # last lines of the linked units
+
+        # line and cycle count where processing stopped
+        self.ip, self.cc = 0, 0
+
+        # breakpoints, watchpoints and stop hook (see debugLines)
+        self.BP = set()     # breakpoint lines
+        self.WP = {}        # watched locations
+        self.SS = False     # single step
+        self.onbreak = None # stop hook
+        self.bk = None      # last stop position
+        self.why = ""       # last stop reason
+
+        # last snapshot taken or restored (pages are shared)
+        self.SB = None
+
+        # cycles limit of the current step (see step)
+        self.SL = None
+
+        # I/O ports by address, input port waited for
+        self.IO, self.IW = {}, None
 
         if self.DBG['REGISTERS']:
-            self.log(f"\nRegisters:")
-            for r in self.REGS.keys():
-                self.log(
+            self.info(f"\nRegisters:")
+            for i, r in enumerate(self.RN):
+                self.info(
                     f"{r:8} = " \
-                    f"0b{self.REGS[r]:0{self.CFG['BITS']}b}")
+                    f"0b{self.S.R[i]:0{self.CFG['BITS']}b}")
 
         # log CONSTANTS
         if self.DBG['CONST']:
             w = self.CFG["BITS"]
-            self.log(f"\nConstants:")
-            self.log(f'CYCLEMAX  = d  {self.CFG["CYCLEMAX"]:{w}d}')
-            self.log(f'BITS      = d  {w:{w}d}')
-            self.log(f'CB        = b {self.CB:0{w}b}')
-            self.log(f'MSK       = b  {self.MSK:0{w}b}')
-            self.log(f'MSB       = b  {self.MSB:0{w}b}')
-            self.log(f'LSB       = b  {self.LSB:0{w}b}')
-            self.log("")            
+            self.info(f"\nConstants:")
+            self.info(f'CYCLEMAX  = d  {self.CFG["CYCLEMAX"]:{w}d}')
+            self.info(f'BITS      = d  {w:{w}d}')
+            self.info(f'CB        = b {self.CB:0{w}b}')
+            self.info(f'MSK       = b  {self.MSK:0{w}b}')
+            self.info(f'MSB       = b  {self.MSB:0{w}b}')
+            self.info(f'LSB       = b  {self.LSB:0{w}b}')
+            self.info("")            
 
         # done
         return
 
-    # destructor
-    
-    def __del__(self):
-        # close log
-        self.lh.close()
-        # done
+# ---- ---- ---- ---- log
+
+    """ Messages have a level: 0 for the program output
+    and the errors, 1 for the information messages and 2
+    for the traces. A destination receives the messages
+    up to its level (CONSOLE for the console, LOGLEVEL for
+    the log file, -1 is silent). Debug flags above both
+    levels are cleared: their messages are never built.
+    """
+
+    # debug flags of the information and trace levels
+
+    DBGLV = {
+        1: ('LOAD', 'CONST', 'CONFIG', 'REGISTERS'),
+        2: ('NOC', 'PARSELINE', 'opNOP', 'opJMP', 'opJNZ',
+            'opJZE', 'opXFR', 'opADC', 'opSHR', 'opSHL',
+            'opAND', 'opIOR', 'opEOR'),
+        }
+
+    # open the console and the log file sinks
+
+    def openLog(self):
+        cl, fl = self.CFG['CONSOLE'], self.CFG['LOGLEVEL']
+        n = self.CFG['LOGBUFFER']
+        L = []
+        # console
+        if cl >= 0: L.append((cl, sink(console(), n)))
+        # log file (written by a thread on request)
+        if fl >= 0:
+            fh = open(self.CFG['LOGFILE'], 'w')
+            if self.CFG['LOGTHREAD']: fh = writer(fh)
+            L.append((fl, sink(fh, n, close = True)))
+        # sinks of each level
+        self.LS = [[h for l, h in L if l >= i] for i in range(3)]
+        # close sinks when the engine is deleted (or at exit)
+        self.lc = finalize(self, closeLog, [h for l, h in L])
+        # clear debug flags nobody will read
+        for i, F in self.DBGLV.items():
+            if not self.LS[i]:
+                for f in F: self.DBG[f] = False
         return
- 
+
+    # flush and close the sinks
+
+    def closeLog(self):
+        self.lc()
+        self.LS = [[], [], []]
+        return
+
+    # write the buffered text of the sinks (before the
+    # processing stops for a hook or for input)
+
+    def flushLog(self):
+        for h in self.LS[0]: h.flush()
+        return
+
     # log
 
-    def log(self, logstr, end = "\n"):
-        # display
-        print(logstr, end = end)
-        # log
-        self.lh.write(f"{str(logstr)}{end}")
+    def log(self, logstr, end = "\n", lv = 0):
+        L = self.LS[lv]
+        if not L: return
+        s = f"{logstr}{end}"
+        for h in L: h.write(s)
         # done
         return
 
+    # information message
+
+    def info(self, logstr, end = "\n"):
+        self.log(logstr, end, 1)
+        return
+
+    # trace message
+
+    def trace(self, logstr, end = "\n"):
+        self.log(logstr, end, 2)
+        return
+
 # ---- ---- ---- ---- registers
 
-    # define default registers
+    # define default registers (STATUS is register number 0)
     
-    REGS = {
-        "STATUS":   0b00000000,
-        "R0":       0b00000000,
-        }
+    REGS = ("STATUS", "R0")
 
 # ---- ---- ---- ---- flags
 
@@ -379,15 +578,17 @@ class engine():
     # raise status register flags
 
     def raiseFlags(self, names):
+        self.flush()
         for n in names:
-            self.REGS["STATUS"] |= self.FLAGS[n]
+            self.S.R[0] |= self.FLAGS[n]
         return
 
     # lower status register flags
     
     def lowerFlags(self, names):
+        self.flush()
         for n in names:
-            self.REGS["STATUS"] &= ~self.FLAGS[n]
+            self.S.R[0] &= ~self.FLAGS[n]
         return
 
     # update Z and N flag from register
@@ -398,12 +599,50 @@ class engine():
         if r & self.MSB > 0: self.raiseFlags("N")
         return
 
+    # flags are evaluated lazily: arithmetic and logic
+    # opcodes only record the tuple (m, z, c, x, y) in
+    # the machine state, where m is the mask of the flags
+    # they set, z the result used for Z and N, c the carry
+    # and x, y the inputs used for the overflow. The flags
+    # are written into STATUS when STATUS is read.
+
+    # record pending flags
+
+    def pending(self, m, z, c = 0, x = 0, y = 0):
+        F = self.S.F
+        # previous flags not covered by the new mask
+        if F is not None and F[0] & ~m: self.flush()
+        self.S.F = (m, z, c, x, y)
+        return
+
+    # write pending flags into STATUS
+
+    def flush(self):
+        S = self.S
+        if S.F is None: return
+        m, z, c, x, y = S.F
+        f = 0
+        if z == 0: f |= self.FLAGS["Z"]
+        if z & self.MSB: f |= self.FLAGS["N"]
+        if m & self.FLAGS["C"] and c: f |= self.FLAGS["C"]
+        if m & self.FLAGS["O"] and (x ^ z) & (y ^ z) & self.MSB:
+            f |= self.FLAGS["O"]
+        S.R[0], S.F = S.R[0] & ~m | f, None
+        return
+
+    # carry flag value (0 or 1)
+
+    def carry(self):
+        F = self.S.F
+        if F is not None and F[0] & 1: return F[2]
+        return self.S.R[0] & 1
+
 # ---- ---- ---- ---- formating
 
     # status register formating function
 
     def statregfm(self, k):
-        s, r = "", self.REGS[k]
+        s, r = "", self.S.R[self.RI[k]]
         for f in self.FLAGS.keys():
             s += f if r & self.FLAGS[f] else "."
         return s
@@ -417,9 +656,10 @@ class engine():
     # any register formatting
     
     def regfm(self, r):
+        self.flush()
         if r in self.REGFM.keys():
             return f"{r}:{self.REGFM[r](self, r)}"
-        return f"{r}:{self.usfm(self.REGS[r])}"
+        return f"{r}:{self.usfm(self.S.R[self.RI[r]])}"
 
     # unsigned(signed) value formatting
     
@@ -429,12 +669,52 @@ class engine():
         # returns unsigned and signed value of x
         return f"{x}:{xs}"
 
-# ---- ---- ---- ---- lists and dicts
+    # label value formatting
 
-    il = []     # instructions list
-    ll = {}     # labels list
-    ml = {}     # memory references
-    MM = []     # memory storage
+    def lblfm(self, op):
+        k, r, o, j = op
+        # memory pointer
+        if r in self.ml.keys():
+            v = self.ml[r]
+            m = f"{r}:{v}"
+            if o is not None: m = f"({m}+{o}):{v+o}"
+        # line pointer
+        else:
+            m = f"{r}:{self.ll[r]}"
+        # word filter
+        if j is not None: m = f"{m} ${j}"
+        return m
+
+    # memory address formatting
+
+    def adrfm(self, op):
+        # register list address
+        if op[0] == "MEM":
+            self.flush()
+            R, I = self.S.R, self.RI
+            m = ", ".join(f"{r}:{R[I[r]]}" for r in op[1])
+            return f"[{m}]"
+        # constant address
+        a = op[1]
+        if a[0] == "IMM": return f"[{a[1]}]"
+        return f"[{self.lblfm(a)}]"
+
+    # source operand formatting (v is the value read)
+
+    def srcfm(self, op, v):
+        k = op[0]
+        if k == "REG": return f"{op[1]}:{v}"
+        if k == "LBL": return self.lblfm(op)
+        if k == "MEM": return f"{self.adrfm(op)}:{v}"
+        return f"{v}"
+
+    # jump destination formatting (a label shows its own
+    # value, the jump goes to its first executable line)
+
+    def jmpfm(self, op, v):
+        if op[0] == "LIN": v = self.ll[op[1]]
+        if op[0] == "RLS": return f"[{', '.join(op[1])}]:{v}"
+        return f"{op[1]}:{v}"
 
 # ---- ---- ---- ---- PARSING METHODS
 
@@ -461,37 +741,28 @@ class engine():
             msg = f'PARSE: "{msg}\\0"'
             if i is not None:
                 msg = f'{i:6} {msg}'
-        # skip heading spaces
-        t, n = skipSpaces(s, 0)
-        # test empty line (no label, implicit nop, no args)
-        if s[n] == "\0":
+        # label, opcode and spaces up to the arguments
+        m = LINE.match(s)
+        lbl, opc, n = m.group(1), m.group(2), m.end()
+        if lbl: lbl = lbl.upper()
+        # check for comment
+        if s[n] == "#": n = len(s)-1
+        # check no opcode (implicit nop, no args)
+        if opc is None and s[n] == "\0":
             if dl & self.DBG['NOC']:
-                self.log(f"\n{msg}")
-                self.log(f"{'-':>8} opcode: 'NOC'")
-            return "", "NOC", "\0"
-        # check for label
-        lbl, n = getLabel(s, n)
-        # reach the opcode
-        t, n = skipSpaces(s, n)
-        # check no opcode (label, implicit nop, no args)
-        if s[n] == "\0":
-            if dl & self.DBG['NOC']:
-                self.log(f"\n{msg}")
-                self.log(f"{'-':>8} opcode: 'NOC'")
-            return lbl, "NOC", "\0"
-        # get the opcode
-        opc, p = getId(s, n)
+                self.trace(f"\n{msg}")
+                self.trace(f"{'-':>8} opcode: 'NOC'")
+            return lbl or "", "NOC", "\0"
         # opcode fail 
         if opc is None:
             return None, f"FAIL", self.parseFail(s, n, i)
+        opc = opc.upper()
         if not opc in self.OPCODES.keys():
-            return None, f"FAIL", self.parseFail(s, n, i)
+            return None, f"FAIL", self.parseFail(s, m.start(2), i)
         # log
         if dl:
-            self.log(f"\n{msg}")
-            self.log(f"{'-':>6} opcode:'{opc}'")
-        # skip spaces to reached arguments
-        t, n = skipSpaces(s, p)
+            self.trace(f"\n{msg}")
+            self.trace(f"{'-':>6} opcode:'{opc}'")
         # collect arguments
         args = s[n:]
         # done
@@ -507,7 +778,7 @@ class engine():
     def getRegister(self, s, p):
         r, n = getId(s, p)
         # check registers list
-        if r in self.REGS.keys():
+        if r in self.RI.keys():
             return r, n
         return None, p
 
@@ -529,151 +800,158 @@ class engine():
         # done
         return R, n
 
+    # operands are decoded into tuples whose first
+    # element is the operand kind:
+    #   ("IMM", value)              integer constant
+    #   ("LBL", name, offset, $n)   label value (line or address)
+    #   ("LIN", name)               label line (jump target)
+    #   ("REG", name)               register
+    #   ("RLS", names)              register list value (jump target)
+    #   ("MEM", names)              memory at register list address
+    #   ("ADR", IMM or LBL)         memory at constant address
+
     def getrefsrc(self, s, p):
-        fail = None, p, ""
+        fail = None, p
         # get reference
         r, n = self.getReference(s, p)
         if r is None: return fail
-        # line pointer
-        if not r in self.ml.keys():
-            # init vars
-            v = self.ll[r] # value
-            m = f"{r}:{v}" # message
-            # check for word filter
+        # no offset, no word filter
+        o, j = None, None
+        # memory pointer: check for offset
+        if r in self.ml.keys():
             t, k = skipSpaces(s, n)
-            if s[k] == "$":
+            if s[k] == "+":
                 # skip spaces and get integer
-                i, k = getInt(s, k+1)
+                t, k = skipSpaces(s, k+1)
+                o, k = getInt(s, k)
                 # check fail
-                if i is None: return fail
+                if o is None: return fail
                 # continue
-                j = i * self.CFG["BITS"]
-                n, v, m = k, (v >> j) & self.MSK, f"{m} ${i}"
-            return v, n, m
-        # memory pointer
-        # init vars
-        v = self.ml[r] # value
-        m = f"{r}:{v}" # message
-        # check for offset
-        t, k = skipSpaces(s, n)
-        if s[k] == "+":
-            # skip spaces and get integer
-            t, k = skipSpaces(s, k+1)
-            i, k = getInt(s, k)
-            # check fail
-            if i is None: return fail
-            # continue
-            n, v, m = k, v + i, f"({m}+{i}):{v+i}"
+                n = k
         # check for word filter
         t, k = skipSpaces(s, n)
         if s[k] == "$":
-            # skip spaces and get integer
-            i, k = getInt(s, k+1)
+            # get integer
+            j, k = getInt(s, k+1)
             # check fail
-            if i is None: return fail
+            if j is None: return fail
             # continue
-            j = i * self.CFG["BITS"]
-            n, v, m = k, (v >> j) & self.MSK, f"{m} ${i}"
-        return v, n, m
+            n = k
+        # done
+        return ("LBL", r, o, j), n
 
     def parseMemoryAddress(self, s, p, db):
         # check for registers
         R, n = self.getRegisterList(s, p)
         if R is not None:
-            # compute address and message
-            adr, wgt, msg = 0, 1, ""
-            for r in R:
-                # add register value with weight
-                adr += self.REGS[r]*wgt
-                # increase weight
-                wgt *= self.CB
-                # pad message
-                msg += f"{r}:{self.REGS[r]}, "
-            # done
-            return adr & self.AWM, n, msg[:-2]
+            return ("MEM", tuple(R)), n
         # fail to parse if no DOUBLEACCESS
-        if not db: return None, p, ""
+        if not db: return None, p
         # check for integer
         i, n = getInt(s, p)
-        # done
         if i is not None:
-            return i & self.AWM, n, f"{i}"
+            return ("ADR", ("IMM", i)), n
         # check for reference
-        adr, n, m = self.getrefsrc(s, p)
-        # done
-        if adr is not None:
-            return adr, n, m
+        a, n = self.getrefsrc(s, p)
+        if a is not None:
+            return ("ADR", a), n
         # failed to parse
-        return None, p, ""
+        return None, p
 
     def getMemoryAddress(self, s, p, db = False):
-        fail = None, p, ""
+        fail = None, p
         # check opening bracket
         if not s[p] == "[":
             return fail
         # parse address
         t, n = skipSpaces(s, p+1)
-        adr, n, msg = self.parseMemoryAddress(s, n, db)
-        if adr is None: return fail
+        a, n = self.parseMemoryAddress(s, n, db)
+        if a is None: return fail
         # check closing bracket
         t, n = skipSpaces(s, n)
         if not s[n] == "]":
             return fail
         # done
-        return adr, n+1, f"[{msg}]"
+        return a, n+1
 
     def getregsrc(self, args):
-        fail = None, None, ""
+        fail = None, None
         # get destination register
         d, n = self.getRegister(args, 0)
-        if d is not None:
-            t, n = skipSpaces(args, n)
-            # source is integer
-            s, n = getInt(args, n)
-            if s is not None:
-                # coerce to bit width
-                v = s & self.MSK
-                if EndOfString(args, n):
-                    return d, v, f"{v}"
-                return fail
-            # source is reference
-            v, n, m =self.getrefsrc(args, n)
-            if v is not None:
-                if EndOfString(args, n):
-                    return d, v, m
-            # source is register
-            s, n = self.getRegister(args, n)
-            if s is not None:
-                # get register value
-                v = self.REGS[s]
-                if EndOfString(args, n):
-                    return d, v, f'{s}:{v}'
-                return fail
-            # source is memory
-            s, n, m = self.getMemoryAddress(args, n)
-            if s is not None:
-                # get memory value
-                v = self.MM[s]                
-                if EndOfString(args, n):
-                    return d, v, f'{m}:{v}'
-                return fail
+        if d is None: return fail
+        t, n = skipSpaces(args, n)
+        # source is integer
+        s, k = getInt(args, n)
+        if s is not None:
+            # coerce to bit width
+            if EndOfString(args, k):
+                return ("REG", d), ("IMM", s & self.MSK)
+            return fail
+        # source is reference
+        s, k = self.getrefsrc(args, n)
+        if s is not None:
+            if EndOfString(args, k):
+                return ("REG", d), s
+        # source is register
+        s, k = self.getRegister(args, n)
+        if s is not None:
+            if EndOfString(args, k):
+                return ("REG", d), ("REG", s)
+            return fail
+        # source is memory
+        s, k = self.getMemoryAddress(args, n)
+        if s is not None:
+            if EndOfString(args, k):
+                return ("REG", d), s
+            return fail
         # parse fail
         return fail
 
     def getmemsrc(self, args):
-        fail = None, 0, ""
-        # get destination memorylabels list
-        d, n, m = self.getMemoryAddress(args, 0)
+        fail = None, None
+        # get destination memory
+        d, n = self.getMemoryAddress(args, 0)
         if d is None: return fail
         t, n = skipSpaces(args, n)
         # source must be register
         s, n = self.getRegister(args, n)
         if s is None: return fail
         if EndOfString(args, n):
-            return d, s, m
+            return d, ("REG", s)
         # parse fail
         return fail
 
+    def getjmpdst(self, args):
+        # init var
+        a = None
+        # check for "register list" parameter
+        R, n = self.getRegisterList(args, 0)
+        if R is not None:
+            # check end of line
+            if not EndOfString(args, n): return None
+            a = ("RLS", tuple(R))
+        # check for "constant" parameter
+        r, n = self.getReference(args, 0)
+        if r is not None:
+            # check end of line
+            if not EndOfString(args, n): return None
+            a = ("LIN", r)
+        # done
+        return a
+
+    def getdspsrc(self, args):
+        # check for register
+        s, n = self.getRegister(args, 0)
+        if s is None:
+            # check for memory
+            s, n = self.getMemoryAddress(args, 0, True)
+        # parsing failed
+        if s is None: return None
+        if not EndOfString(args, n): return None
+        # register or memory
+        if isinstance(s, str): return ("REG", s)
+        return s
+
     def getContent(self, s, p, i):
         # try string content
         c, n = getString(s, p)
@@ -712,13 +990,14 @@ class engine():
 
     # no code
 
-    def opNOC(self, args, ip, cc, header = ""):
+    def opNOC(self, d, ip, cc, header = ""):
         # self.log(f"{header}noc")
-        return True, ip+1, cc
+        return True, d.nx, cc
 
     # allocate memory (run-time error)
     
-    def opMEM(self, args, ip, cc, header = ""):
+    def opMEM(self, d, ip, cc, header = ""):
+        header = header or f" {ip:04}  {cc:06}  "
         self.log(
             f"{header}MEM error: " \
             f"MEM is not an executable instruction")
@@ -726,218 +1005,168 @@ class engine():
 
     # display/log register/memory
     
-    def opDSP(self, args, ip, cc, header = ""):
-        # check for register
-        s, n = self.getRegister(args, 0)
-        if s is not None:
-            self.log(f'{header}{self.regfm(s)}')
-            return EndOfString(args, n), ip+1, cc
-        # check for memory
-        s, n, m = self.getMemoryAddress(args, 0, True)
-        if s is not None:
-            v = self.MM[s]
-            self.log(f'{header}{m}:{self.usfm(v)}')
-            return EndOfString(args, n), ip+1, cc
-        # parsing failed
-        self.log(f'{header} DSP error: invalid argument')
+    def opDSP(self, d, ip, cc, header = ""):
+        # header (not formatted by the release loops)
+        header = header or f" {ip:04}  {cc:06}  "
+        # display register
+        if d.src[0] == "REG":
+            self.log(f'{header}{self.regfm(d.src[1])}')
+            return True, d.nx, cc
+        # display memory
+        v = d.rd()
+        self.log(f'{header}{self.adrfm(d.src)}:{self.usfm(v)}')
         # done
+        return True, d.nx, cc
+
+    # arguments failed to decode (run-time error)
+
+    ERRMSG = {
+        "NOP": "NOP error: no argument expected",
+        "DSP": "{h} DSP error: invalid argument",
+        "XFR": "{h}XFR error: parsing failed",
+        "JMP": "{h}JMP error: parsing failed",
+        "JNZ": "{h}JNZ error: parsing failed",
+        "JZE": "{h}JZE error: parsing failed",
+    }
+
+    def opERR(self, d, ip, cc, header = ""):
+        # other opcodes fail silently
+        if d.opc in self.ERRMSG:
+            header = header or f" {ip:04}  {cc:06}  "
+            self.log(self.ERRMSG[d.opc].format(h = header))
         return False, ip+1, cc
 
 # ---- ---- ---- ---- Null Operation
 
     # one cycle delay
 
-    def opNOP(self, args, ip, cc, header = ""):
+    def opNOP(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opNOP']
-        # check number of parameters
-        if not args == '\0':
-            self.log(f"NOP error: no argument expected")
-            return False, ip, cc 
         # log
-        if dl: self.log(f"{header}NOP")
+        if dl: self.trace(f"{header}NOP")
         # done
-        return True, ip+1, cc+1
+        return True, d.nx, cc+1
 
 # ---- ---- ---- ---- jump opcodes
 
     # general jump method
-    def opJMP(self, args, ip, cc, header = "", 
+    def opJMP(self, d, ip, cc, header = "", 
             op = "JMP", condition = True):
-        # init vars
-        dl, adr, msg = self.DBG[f'op{op}'], None, None
-
-        # check for "register list" parameter
-        R, n = self.getRegisterList(args, 0)
-        if R is not None:
-            # check end of line
-            if not EndOfString(args, n):
-                self.log(f'{header}{op} error: parsing failed')
-                return False, ip+1, cc
-            # computer line address
-            adr, wgt, msg = 0, 1, "["
-            for r in R:
-                # add register value with weight
-                adr += self.REGS[r]*wgt
-                # increase weight
-                wgt *= self.CB
-                # update message
-                msg = f"{msg}{r}, "
-            # close bracket
-            msg = f"{msg[:-2]}]"
-        # check for "constant" parameter
-        r, n = self.getReference(args, 0)
-        if r is not None:
-            # check end of line
-            if not EndOfString(args, n):
-                self.log(f'{header}{op} error: parsing failed')
-                return False, ip+1, cc
-            adr, msg = self.ll[r], r
-        # branch: jump or continue
-        if adr is not None:
-            # jump
-            if condition:
-                if dl: self.log(f"{header}{op} to {msg}:{adr}")
-                return True, adr, cc+1
-            # continue
-            else:
-                if dl: self.log(f"{header}{op} continue")
-                return True, ip+1, cc+1
-        # fail parse
-        self.log(f'{header}{op} error: parsing failed')
-        return False, ip+1, cc
+        # debug flag
+        dl = self.DBG[f'op{op}']
+        # jump
+        if condition:
+            adr = d.rx()
+            if dl: self.trace(
+                f"{header}{op} to {self.jmpfm(d.dst, adr)}")
+            return True, adr, cc+1
+        # continue
+        if dl: self.trace(f"{header}{op} continue")
+        return True, d.nx, cc+1
 
     # jump if zero (Z set)
-    def opJZE(self, args, ip, cc, header = ""):
-        Z = self.REGS["STATUS"]  & self.FLAGS["Z"] > 0
-        return self.opJMP(args, ip, cc, header, "JZE", Z)
+    def opJZE(self, d, ip, cc, header = ""):
+        F = self.S.F
+        Z = self.S.R[0] & self.FLAGS["Z"] > 0 if F is None else F[1] == 0
+        return self.opJMP(d, ip, cc, header, "JZE", Z)
 
     # jump if non zero (Z clear)
-    def opJNZ(self, args, ip, cc, header = ""):
-        Z = self.REGS["STATUS"]  & self.FLAGS["Z"] > 0
-        return self.opJMP(args, ip, cc, header, "JNZ", not Z)
+    def opJNZ(self, d, ip, cc, header = ""):
+        F = self.S.F
+        Z = self.S.R[0] & self.FLAGS["Z"] > 0 if F is None else F[1] == 0
+        return self.opJMP(d, ip, cc, header, "JNZ", not Z)
 
 # ---- ---- ---- ---- transfer opcodes
 
-    def opXFR(self, args, ip, cc, header = ""):
+    def opXFR(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opXFR']
+        # read source
+        v = d.rd()
         # destination is register
-        r, v, m = self.getregsrc(args)
-        if r is not None:
-            # transfert
-            self.REGS[r] = v
-            # log
-            if dl: self.log(
-                f"{header}{r} = " \
-                f"{m} = " \
-                f"{self.usfm(v)}")
-            return True, ip+1, cc+1
+        if d.dst[0] == "REG":
+            # message before transfer
+            if dl: m = f"{d.dst[1]} = {self.srcfm(d.src, v)}"
         # destination is memory
-        d, s, m = self.getmemsrc(args)
-        if d is not None:
-            self.MM[d] = self.REGS[s]
-            # done
-            if dl: self.log(
-                f"{header}{m} = " \
-                f"{s}:{self.REGS[s]} = " \
-                f"{self.usfm(self.REGS[s])}")
-            return True, ip+1, cc+1
-        # fail parse
-        self.log(f'{header}XFR error: parsing failed')
-        return False, ip+1, cc
+        else:
+            # message before transfer
+            if dl: m = f"{self.adrfm(d.dst)} = {d.src[1]}:{v}"
+        # transfer
+        d.wr(v)
+        # log
+        if dl: self.trace(f"{header}{m} = {self.usfm(v)}")
+        # done
+        return True, d.nx, cc+1
 
 # ---- ---- ---- ---- arithmetic opcodes
 
     # sum
 
-    def opADC(self, args, ip, cc, header = ""):
+    def opADC(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opADC']
-        # retrieve accumulator and operand 
-        regdest, value, msg = self.getregsrc(args)
-        if regdest is None:
-            return False, ip+1, cc
         # record values
-        x, y = self.REGS[regdest], value
+        x, y = d.rx(), d.rd()
         # get input carry
-        cin = self.REGS['STATUS'] & self.FLAGS['C'] > 0
+        cin = self.carry()
         # perform operation
-        z = x + y + [0, 1][cin]
-        msg += [" + C:0", " + C:1"][cin]
-        # compute signs from sign bits
-        sx = x & self.MSB > 0
-        sy = y & self.MSB > 0
-        sz = z & self.MSB > 0
-        # clear overflow and carry
-        self.lowerFlags("OC")
-        # update overflow
-        O = (sx & sy & ~sz) | (~sx & ~sy & sz)
-        if O: self.raiseFlags("O")
-        # update carry
-        C = z & self.CB > 0
-        if C: self.raiseFlags("C")
+        z = x + y + cin
+        if dl:
+            msg = self.srcfm(d.src, y)
+            msg += [" + C:0", " + C:1"][cin]
+        # carry out
+        C = z >> self.CFG['BITS'] & 1
         # coerce to bits size
         z &= self.MSK
-        # update other flags
-        self.updateZN(z)
+        # update flags (all flags are replaced)
+        self.S.F = (15, z, C, x, y)
         # update destination register
-        self.REGS[regdest] = z
+        d.wr(z)
         # done
-        if dl: self.log(
-            f'{header}{regdest} = ' \
-            f'{regdest}:{x} + {msg} = {self.usfm(z)}')
-        return True, ip+1, cc+1
+        if dl: self.trace(
+            f'{header}{d.dst[1]} = ' \
+            f'{d.dst[1]}:{x} + {msg} = {self.usfm(z)}')
+        return True, d.nx, cc+1
 
     # shift right
 
-    def opSHR(self, args, ip, cc, header = ""):
+    def opSHR(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opSHR']
-        # get the destination/source register
-        regdest, n = self.getRegister(args, 0)
-        if regdest is None:
-            return False, ip+1, cc
         # record value
-        x = self.REGS[regdest]
-        # get carry and clear
-        C = self.REGS["STATUS"] & self.FLAGS["C"] > 0
-        self.lowerFlags("C")
+        x = d.rx()
+        # get carry
+        C = self.carry()
         # get output bit
-        D = x & self.LSB > 0
+        D = x & self.LSB
         # perform operation
         z = x >> 1
         # insert carry
         if C: z += self.MSB
         # update Carry and other flags
-        if D: self.raiseFlags("C")
-        self.updateZN(z)
+        self.pending(13, z, D)
         # update destination
-        self.REGS[regdest] = z
+        d.wr(z)
         # log
         if dl:
             cs = [f"+ C:{0}", f"+ C:{self.MSB}"][C]
-            self.log(
-                f'{header}{regdest} = ' \
-                f'>> {regdest}:{x} {cs} = '\
+            self.trace(
+                f'{header}{d.dst[1]} = ' \
+                f'>> {d.dst[1]}:{x} {cs} = '\
                 f'{self.usfm(z)}')
         # done
-        return True, ip+1, cc+1
+        return True, d.nx, cc+1
 
     # shift left
 
-    def opSHL(self, args, ip, cc, header = ""):
+    def opSHL(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opSHL']
-        # get the destination/source register
-        regdest, n = self.getRegister(args, 0)
-        if regdest is None:
-            return False, ip+1, cc
         # record value
-        x = self.REGS[regdest]
-        # get carry and clear
-        C = self.REGS["STATUS"] & self.FLAGS["C"] > 0
-        self.lowerFlags("C")
+        x = d.rx()
+        # get carry
+        C = self.carry()
         # get output bit
         D = x & self.MSB > 0
         # perform operation
@@ -947,89 +1176,183 @@ class engine():
         # insert carry
         if C: z += self.LSB
         # update Carry and other flags
-        if D: self.raiseFlags("C")
-        self.updateZN(z)
+        self.pending(13, z, D)
         # update destination
-        self.REGS[regdest] = z
+        d.wr(z)
         # done
         if dl:
             cs = [f"+ C:{0}", f"+ C:{self.LSB}"][C]
-            self.log(
-                f'{header}{regdest} = ' \
-                f'<< {regdest}:{x} {cs} = ' \
+            self.trace(
+                f'{header}{d.dst[1]} = ' \
+                f'<< {d.dst[1]}:{x} {cs} = ' \
                 f'{self.usfm(z)}')
-        return True, ip+1, cc+1
+        return True, d.nx, cc+1
 
 # ---- ---- ---- ---- logic opcodes
 
     # logic AND
 
-    def opAND(self, args, ip, cc, header = ""):
+    def opAND(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opAND']
-        # retrieve accumulator and operand 
-        regdest, value, msg = self.getregsrc(args)
-        if regdest is None:
-            return False, ip+1, cc
         # record values
-        x, y = self.REGS[regdest], value
+        x, y = d.rx(), d.rd()
+        if dl: msg = self.srcfm(d.src, y)
         # perform operation
         z = x & y
         # update flags
-        self.updateZN(z)
+        self.pending(12, z)
         # update destination register
-        self.REGS[regdest] = z
+        d.wr(z)
         # done
-        if dl: self.log(
-            f'{header}{regdest} = ' \
-            f'{regdest}:{x} & {msg} = {self.usfm(z)}')
-        return True, ip+1, cc+1
+        if dl: self.trace(
+            f'{header}{d.dst[1]} = ' \
+            f'{d.dst[1]}:{x} & {msg} = {self.usfm(z)}')
+        return True, d.nx, cc+1
 
     # inclusive OR
 
-    def opIOR(self, args, ip, cc, header = ""):
+    def opIOR(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opIOR']
-        # retrieve accumulator and operand 
-        regdest, value, msg = self.getregsrc(args)
-        if regdest is None:
-            return False, ip+1, cc
         # record values
-        x, y = self.REGS[regdest], value
+        x, y = d.rx(), d.rd()
+        if dl: msg = self.srcfm(d.src, y)
         # perform operation
         z = x | y
         # update flags
-        self.updateZN(z)
+        self.pending(12, z)
         # update destination register
-        self.REGS[regdest] = z
+        d.wr(z)
         # done
-        if dl: self.log(
-            f'{header}{regdest} = ' \
-            f'{regdest}:{x} v {msg} = {self.usfm(z)}')
-        return True, ip+1, cc+1
+        if dl: self.trace(
+            f'{header}{d.dst[1]} = ' \
+            f'{d.dst[1]}:{x} v {msg} = {self.usfm(z)}')
+        return True, d.nx, cc+1
 
     # exclusive OR
 
-    def opEOR(self, args, ip, cc, header = ""):
+    def opEOR(self, d, ip, cc, header = ""):
         # debug flag
         dl = self.DBG['opEOR']
-        # retrieve accumulator and operand 
-        regdest, value, msg = self.getregsrc(args)
-        if regdest is None:
-            return False, ip+1, cc
         # record values
-        x, y = self.REGS[regdest], value
+        x, y = d.rx(), d.rd()
+        if dl: msg = self.srcfm(d.src, y)
         # perform operation
         z = x ^ y
         # update flags
-        self.updateZN(z)
+        self.pending(12, z)
         # update destination register
-        self.REGS[regdest] = z
+        d.wr(z)
         # done
-        if dl: self.log(
-            f'{header}{regdest} = ' \
-            f'{regdest}:{x} ^ {msg} = {self.usfm(z)}')
-        return True, ip+1, cc+1
+        if dl: self.trace(
+            f'{header}{d.dst[1]} = ' \
+            f'{d.dst[1]}:{x} ^ {msg} = {self.usfm(z)}')
+        return True, d.nx, cc+1
+
+# ---- ---- ---- ---- release opcodes
+
+    """ The same opcodes without debug flag check, message
+    or header: the release variant of an opcode is bound to
+    the decoded lines unless its debug flag is set (see
+    handler and dispatch).
+    """
+
+    def rlNOP(self, d, ip, cc, header = ""):
+        return True, d.nx, cc+1
+
+    def rlJMP(self, d, ip, cc, header = ""):
+        return True, d.rx(), cc+1
+
+    # jump if zero (Z set)
+    def rlJZE(self, d, ip, cc, header = ""):
+        F = self.S.F
+        if F is None and self.S.R[0] & 4 or F is not None and F[1] == 0:
+            return True, d.rx(), cc+1
+        return True, d.nx, cc+1
+
+    # jump if non zero (Z clear)
+    def rlJNZ(self, d, ip, cc, header = ""):
+        F = self.S.F
+        if F is None and self.S.R[0] & 4 or F is not None and F[1] == 0:
+            return True, d.nx, cc+1
+        return True, d.rx(), cc+1
+
+    def rlXFR(self, d, ip, cc, header = ""):
+        d.wr(d.rd())
+        return True, d.nx, cc+1
+
+    def rlADC(self, d, ip, cc, header = ""):
+        x, y = d.rx(), d.rd()
+        z, M = x + y + self.carry(), self.MSK
+        # all flags are replaced (carry out when z overflows)
+        self.S.F = (15, z & M, 1 if z > M else 0, x, y)
+        d.wr(z & M)
+        return True, d.nx, cc+1
+
+    def rlSHR(self, d, ip, cc, header = ""):
+        x = d.rx()
+        z = x >> 1
+        if self.carry(): z += self.MSB
+        self.pending(13, z, x & 1)
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    def rlSHL(self, d, ip, cc, header = ""):
+        x = d.rx()
+        z = x << 1 & self.MSK
+        if self.carry(): z += 1
+        self.pending(13, z, x & self.MSB > 0)
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    def rlAND(self, d, ip, cc, header = ""):
+        z = d.rx() & d.rd()
+        self.pending(12, z)
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    def rlIOR(self, d, ip, cc, header = ""):
+        z = d.rx() | d.rd()
+        self.pending(12, z)
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    def rlEOR(self, d, ip, cc, header = ""):
+        z = d.rx() ^ d.rd()
+        self.pending(12, z)
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    # without flags (never read after the line)
+
+    def nfADC(self, d, ip, cc, header = ""):
+        d.wr(d.rx() + d.rd() + self.carry() & self.MSK)
+        return True, d.nx, cc+1
+
+    def nfSHR(self, d, ip, cc, header = ""):
+        z = d.rx() >> 1
+        if self.carry(): z += self.MSB
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    def nfSHL(self, d, ip, cc, header = ""):
+        z = d.rx() << 1 & self.MSK
+        if self.carry(): z += 1
+        d.wr(z)
+        return True, d.nx, cc+1
+
+    def nfAND(self, d, ip, cc, header = ""):
+        d.wr(d.rx() & d.rd())
+        return True, d.nx, cc+1
+
+    def nfIOR(self, d, ip, cc, header = ""):
+        d.wr(d.rx() | d.rd())
+        return True, d.nx, cc+1
+
+    def nfEOR(self, d, ip, cc, header = ""):
+        d.wr(d.rx() ^ d.rd())
+        return True, d.nx, cc+1
 
 # ---- ---- ---- ---- opcode names definition
 
@@ -1042,19 +1365,75 @@ class engine():
         "JMP": opJMP, "JNZ": opJNZ, "JZE": opJZE,  # flow
         }
 
+    RELEASE = {
+        "NOP": rlNOP,                              # no operation
+        "XFR": rlXFR,                              # transfer
+        "ADC": rlADC, "SHR": rlSHR, "SHL": rlSHL,  # arithmetics
+        "AND": rlAND, "IOR": rlIOR, "EOR": rlEOR,  # logic
+        "JMP": rlJMP, "JNZ": rlJNZ, "JZE": rlJZE,  # flow
+        }
+
+    NOFLAGS = {
+        "ADC": nfADC, "SHR": nfSHR, "SHL": nfSHL,  # arithmetics
+        "AND": nfAND, "IOR": nfIOR, "EOR": nfEOR,  # logic
+        }
+
+    # handler of the opcode o for the debug flags set (nf:
+    # the flags are never read, see optimizer)
+
+    def handler(self, o, nf = False):
+        if o in self.RELEASE and not self.DBG[f"op{o}"]:
+            if nf: return self.NOFLAGS[o]
+            return self.RELEASE[o]
+        return self.OPCODES[o]
+
+    # bind the handlers again when the debug flags changed
+    # since the last run (DK: flags of the handlers bound)
+
+    DK = None
+
+    def dispatch(self):
+        k = tuple(self.DBG.values())
+        if k == self.DK: return
+        self.DK = k
+        for d in self.dl:
+            if d.fn is not engine.opERR: d.fn = self.handler(d.opc, d.nf)
+        return
+
 # ---- ---- ---- ---- load
 
+    # load code from the cache or from the text s
+
+    def load(self, s):
+        # no garbage collection while loading: many
+        # objects are created and almost none released
+        gcon = gc.isenabled()
+        gc.disable()
+        try:
+            # cached result of a previous load
+            cf = self.cachefile(s)
+            if cf and self.loadcache(cf): return self.optimizeCode()
+            # parse and decode
+            if not self.loadCode(s): return False
+            # record for the next load of the same code
+            if cf: self.savecache(cf)
+            return self.optimizeCode()
+        finally:
+            if gcon: gc.enable()
+
     # the first pass (no execution)
     # collect labels (setup pointers)
 
-    def load(self, s):
+    def loadCode(self, s):
         # debug flag
         dl = self.DBG['LOAD']
-        if dl: self.log("load code:")
+        if dl: self.info("load code:")
         # append to list of instructions
         self.il += s.split("\n")
         # add dummy first line to fix line sync with editor numbering
         self.il.insert(0,"")
+        # decoded instructions (the dummy line is a no code)
+        self.dl = [instruction("NOC", self.OPCODES["NOC"], "\0", 1)]
         # collect all references in first pass
         for i, s in enumerate(self.il):
             # skip dummy line
@@ -1069,6 +1448,8 @@ class engine():
                 self.log(f"{args}")
                 self.log(f"exiting...")
                 return False
+            # record decoded line
+            self.dl.append(instruction(opc, self.OPCODES[opc], args, i+1))
             # no label
             if not lbl: continue
             # check for existing reference
@@ -1079,8 +1460,8 @@ class engine():
                 return False
             # add label to reference list
             if dl: 
-                self.log(f"{'-':>6} new label '{lbl}'", end = "")
-                self.log(f" at line {i}")
+                self.info(f"{'-':>6} new label '{lbl}'", end = "")
+                self.info(f" at line {i}")
             self.ll[lbl] = i
             # check for special opcode MEM
             if opc == "MEM":
@@ -1090,29 +1471,76 @@ class engine():
                     return False
                 # done
                 continue
+        # skip the no code lines (before the jumps are bound)
+        self.skipLines()
         # compute address width and mask
-        w, l = 0, len(self.MM)-1
+        w = self.addressMask()
+        # second pass: decode operands
+        for d in self.dl:
+            if self.decode(d): self.bind(d)
+        # display summery
+        if dl: 
+            self.info("\nsummary:")
+            self.info(f" recorded {len(self.ll)} label(s)")
+            self.info(f" recorded {len(self.ml)} address(es)")
+            self.info(f" full memory size is {len(self.S.MM)}")
+            self.info(f" address width is {w}")
+            self.info(f" address mask is {self.AWM}")
+        # keep the initial memory image (see reset)
+        self.M0 = self.S.MM[:]
+        # done
+        return True
+
+    # link each line to the next executable line: the no
+    # code lines (blanks, comments, lone labels) are never
+    # run. Line numbers are kept (traces and errors) and MEM
+    # lines stay executable (run-time error). The last line
+    # of a linked unit does not run into the next unit.
+
+    def skipLines(self):
+        dl, EL = self.dl, self.EL
+        # next executable line (or end of code)
+        x = len(dl)
+        for i in range(len(dl)-1, -1, -1):
+            if i in EL: x = len(dl)
+            dl[i].nx = x
+            if dl[i].opc != "NOC": x = i
+        return
+
+    # optional optimization pass (OPTIMIZE, see optimizer):
+    # the cache keeps the program as loaded
+
+    def optimizeCode(self):
+        if not self.CFG['OPTIMIZE']: return True
+        K = optimize(self)
+        if self.DBG['LOAD']:
+            self.info("\noptimization:")
+            for k, v in K.items(): self.info(f" {k} {v}")
+        return True
+
+    # jump target of the label l: its first executable line
+    # (the label value is unchanged, code labels are also
+    # used as data)
+
+    def target(self, l):
+        i = self.ll[l]
+        return self.dl[i].nx if self.dl[i].opc == "NOC" else i
+
+    # set the address mask of the memory size, return
+    # the address width
+    def addressMask(self):
+        w, l = 0, len(self.S.MM)-1
         # prevent infinite loop when memory size is null
         if l < 0: l = 0
         # compute width
         while l: w, l = w+1, l>>1
         # get mask
         self.AWM = 2**w-1
-        # display summery
-        if dl: 
-            self.log("\nsummary:")
-            self.log(f" recorded {len(self.ll)} label(s)")
-            self.log(f" recorded {len(self.ml)} address(es)")
-            self.log(f" full memory size is {len(self.MM)}")
-            self.log(f" address width is {w}")
-            self.log(f" address mask is {self.AWM}")
-        # done
-        return True
+        return w
 
-    # allocate memory
-    def allocate(self, lbl, args):
-        # debug flag
-        dl = self.DBG['LOAD']
+    # parse the arguments of MEM: return the allocation
+    # length and content (None for zeros), None on failure
+    def memargs(self, args):
         # look for an integer value
         i, n = getInt(args, 0)
         # parse failed
@@ -1120,17 +1548,17 @@ class engine():
             self.log(
                 "MEM error: allocation length" \
                 " undefined, integer expected")
-            return False
+            return None
         # check boundary
         if i < 1:
             self.log(
                 "MEM error: allocation length" \
                 " should be strictly positive")
-            return False
+            return None
         # reach for next argument
         t, n = skipSpaces(args, n)
-        # create default array
-        c = [0]*i # zero set
+        # default array is a zero set
+        c = None
         # c = list(range(i)) # linear set
         # make the option random set
         # check for explicit content
@@ -1141,22 +1569,49 @@ class engine():
             c, n = self.getContent(args, n, i)
             # reach for next argument
             t, n = skipSpaces(args, n)
+        # check for content read from a binary file
+        elif args[n] == "<":
+            # reach for next argument
+            t, n = skipSpaces(args, n+1)
+            # file name
+            f, n = getString(args, n)
+            if f is None:
+                self.log("MEM error: file name string expected")
+                return None
+            # read memory content
+            c = self.readwords(f, i)
+            if c is None: return None
+            # reach for next argument
+            t, n = skipSpaces(args, n)
         # verify end of args
         if not args[n] == '\0':
             self.log(
                 "MEM error: failed to parse," \
                 " end of string expected")
-            return False
-        # record new memory address
-        self.ml[lbl] = len(self.MM)
+            return None
+        # done
+        return i, c
+
+    # allocate memory
+    def allocate(self, lbl, args):
+        # debug flag
+        dl = self.DBG['LOAD']
+        # length and content
+        a = self.memargs(args)
+        if a is None: return False
+        i, c = a
+        # record new memory address and size
+        self.ml[lbl], self.mz[lbl] = len(self.S.MM), i
         # log
-        if dl: self.log(
+        if dl: self.info(
             f" new pointer '{lbl}' at address " \
             f"{self.ml[lbl]}:")
         # allocate memory
-        self.MM.extend(c)
+        self.S.extend(i, c)
         # log
         if dl:
+            # zero set
+            if c is None: c = [0]*i
             # format memory value
             def fmv(i):
                 # return f"{i:03}"
@@ -1165,63 +1620,1030 @@ class engine():
             # tab
             tab = 2 * " "
             # display comment
-            self.log(f" allocate + {i}:")
+            self.info(f" allocate + {i}:")
             # display memory array
             r = tab
             for i in c:
                 # check maximum width
                 if len(r) > 32:
                     # log
-                    self.log(r)
+                    self.info(r)
                     # re-start
                     r = f"{tab}{fmv(i)},"
                 else:
                     # continue: append
                     r += f"{fmv(i)},"
             # last part
-            self.log(f"{r[:-1]}")        
+            self.info(f"{r[:-1]}")        
+        # done
+        return True
+
+# ---- ---- ---- ---- decode
+
+    # decode the arguments of an instruction into
+    # operands (second pass, all labels are known)
+
+    def decode(self, d):
+        # default handler
+        d.fn = self.handler(d.opc)
+        # parse operands
+        o, a = d.opc, d.args
+        if o == "NOP":
+            ok = a == "\0"
+        elif o == "DSP":
+            d.src = self.getdspsrc(a)
+            ok = d.src is not None
+        elif o in ("JMP", "JNZ", "JZE"):
+            d.dst = self.getjmpdst(a)
+            ok = d.dst is not None
+        elif o == "XFR":
+            d.dst, d.src = self.getregsrc(a)
+            if d.dst is None:
+                d.dst, d.src = self.getmemsrc(a)
+            ok = d.dst is not None
+        elif o in ("ADC", "AND", "IOR", "EOR"):
+            d.dst, d.src = self.getregsrc(a)
+            ok = d.dst is not None
+        elif o in ("SHR", "SHL"):
+            r, n = self.getRegister(a, 0)
+            if r is not None: d.dst = ("REG", r)
+            ok = d.dst is not None
+        else:
+            ok = True
+        # report failure at run time
+        if not ok: d.fn = engine.opERR
+        # done
+        return ok
+
+    # compute the value of a label operand
+
+    def lblval(self, op):
+        k, r, o, j = op
+        # memory pointer (with offset)
+        if r in self.ml.keys():
+            v = self.ml[r]
+            if o is not None: v += o
+        # line pointer
+        else:
+            v = self.ll[r]
+        # word filter
+        if j is not None:
+            v = (v >> j*self.CFG["BITS"]) & self.MSK
+        return v
+
+    # build a function returning the operand value
+
+    def reader(self, op):
+        S, R, MM = self.S, self.S.R, self.S.MM
+        k = op[0]
+        # constants
+        if k == "IMM":
+            v = op[1]
+            return lambda: v
+        if k == "LBL":
+            v = self.lblval(op)
+            return lambda: v
+        if k == "LIN":
+            v = self.target(op[1])
+            return lambda: v
+        # register
+        if k == "REG":
+            r = self.RI[op[1]]
+            # STATUS: write pending flags first
+            if r == 0:
+                flush = self.flush
+                def f():
+                    flush()
+                    return R[0]
+                return f
+            return lambda: R[r]
+        # register list value
+        if k == "RLS":
+            return self.rlsval(op[1])
+        # input ports (the memory keeps the last word read)
+        P = {a: p.read for a, p in self.IO.items() if p.src is not None}
+        # memory at register list address
+        if k == "MEM":
+            f = self.rlsval(op[1], self.AWM)
+            if P:
+                D, s = self.S.D, self.PAGEBITS
+                def g():
+                    a = f()
+                    if a in P:
+                        MM[a] = P[a]()
+                        D.add(a >> s)
+                    return MM[a]
+                return g
+            return lambda: MM[f()]
+        # memory at constant address
+        if k == "ADR":
+            a = op[1]
+            if a[0] == "IMM": a = a[1] & self.AWM
+            else: a = self.lblval(a)
+            if a in P:
+                rd, D, p = P[a], self.S.D, a >> self.PAGEBITS
+                def g():
+                    MM[a] = rd()
+                    D.add(p)
+                    return MM[a]
+                return g
+            return lambda: MM[a]
+        return None
+
+    # build a function writing the operand value
+
+    def writer(self, op):
+        S, R, MM = self.S, self.S.R, self.S.MM
+        k = op[0]
+        # register
+        if k == "REG":
+            r = self.RI[op[1]]
+            # STATUS: pending flags are overwritten
+            if r == 0:
+                def w(v):
+                    S.F = None
+                    R[0] = v
+                return w
+            def w(v): R[r] = v
+            return w
+        # memory at register list address
+        if k == "MEM":
+            f, M = self.rlsval(op[1], self.AWM), self.MSK
+            # pages written (see pages)
+            D, s = S.D, self.PAGEBITS
+            # output ports (the memory keeps the last word written)
+            P = {a: p.write for a, p in self.IO.items() if p.dst is not None}
+            if P:
+                def w(v):
+                    a = f()
+                    MM[a] = v & M
+                    D.add(a >> s)
+                    if a in P: P[a](v & M)
+                return w
+            def w(v):
+                a = f()
+                MM[a] = v & M
+                D.add(a >> s)
+            return w
+        return None
+
+    # build a function returning the value of a register list:
+    # the first register is the least significant word
+
+    def rlsval(self, R, mask = None):
+        RR, CB = self.S.R, self.CB
+        # register numbers
+        R = [self.RI[r] for r in R]
+        # weights
+        W = [(r, CB**i) for i, r in enumerate(R)]
+        # STATUS: write pending flags first
+        if 0 in R:
+            flush = self.flush
+            def f():
+                flush()
+                v = sum(RR[r]*w for r, w in W)
+                return v if mask is None else v & mask
+            return f
+        # single register
+        if len(R) == 1:
+            r = R[0]
+            if mask is None: return lambda: RR[r]
+            return lambda: RR[r] & mask
+        # weighted sum
+        if mask is None: return lambda: sum(RR[r]*w for r, w in W)
+        return lambda: sum(RR[r]*w for r, w in W) & mask
+
+    # bind the operand access functions of an instruction
+
+    def bind(self, d):
+        if d.dst is not None:
+            d.rx, d.wr = self.reader(d.dst), self.writer(d.dst)
+        if d.src is not None:
+            d.rd = self.reader(d.src)
+        return
+
+    # build a function returning the kind (see tracefile)
+    # and the register number or memory address of an operand
+
+    def locator(self, op):
+        if op is None: return None
+        k = op[0]
+        if k == "REG":
+            r = self.RI[op[1]]
+            return lambda: (1, r)
+        if k == "MEM":
+            f = self.rlsval(op[1], self.AWM)
+            return lambda: (2, f())
+        if k == "ADR":
+            a = op[1]
+            if a[0] == "IMM": a = a[1] & self.AWM
+            else: a = self.lblval(a)
+            return lambda: (2, a)
+        return None
+
+# ---- ---- ---- ---- memory views
+
+    # zero-copy view of the memory storage or of the
+    # region allocated to a label (memory can not grow
+    # while a view is held, take views after load, and the
+    # words written through a view are marked with touched)
+
+    def view(self, lbl = None):
+        MM = self.S.MM
+        # words wider than 64 bits are stored in a list
+        if isinstance(MM, list):
+            self.log(
+                f"view error: no buffer for " \
+                f"{self.CFG['BITS']} bits words")
+            return None
+        # full memory
+        if lbl is None: return memoryview(MM)
+        # labelled region
+        if not lbl.upper() in self.ml.keys():
+            self.log(f"view error: unknown memory label '{lbl}'")
+            return None
+        a, n = self.ml[lbl.upper()], self.mz[lbl.upper()]
+        return memoryview(MM)[a:a+n]
+
+# ---- ---- ---- ---- I/O ports
+
+    """ A memory address can be made an I/O port after load
+    (see ioport): reading it takes the next word of an
+    input stream, writing it sends the word to an output
+    stream. The operands are bound again to access the
+    ports and the interpreter runs the program. A read from
+    an empty asyncio queue stops the processing before the
+    line; IW is then the port waited for.
+    """
+
+    # make the address or the first word of the memory label
+    # where an I/O port with input and output streams
+
+    def port(self, where, input = None, output = None):
+        if isinstance(where, str):
+            r = self.region(where)
+            if r is None: return False
+            where = r[0]
+        if not 0 <= where < len(self.S.MM):
+            self.log(f"port error: no address {where}")
+            return False
+        self.IO[where] = ioport(self, where, input, output)
+        # bind the operands again
+        for d in self.dl:
+            if d.fn is not engine.opERR: self.bind(d)
+        return True
+
+    # write the buffered output of the ports
+
+    def flushPorts(self):
+        for p in self.IO.values(): p.flush()
+        return
+
+    # stop before line ip, waiting for input on port a
+
+    def waiting(self, ip, cc, a):
+        self.flush()
+        self.flushPorts()
+        self.ip, self.cc, self.IW = ip, cc, self.IO[a]
+        # the line runs when processing resumes
+        self.bk, self.why = (ip, cc), "input"
+        self.log(f"\nwaiting for input at line {ip}.")
+        self.flushLog()
+        return
+
+# ---- ---- ---- ---- memory files
+
+    """ Memory is imported from and exported to raw binary
+    files of little-endian words, the size of the memory
+    storage words (1, 2, 4 or 8 bytes, and the smallest
+    number of bytes holding BITS for wider words). Files
+    are read through mmap: large data tables are copied
+    into the memory without being parsed. A MEM line can
+    bind a label to a file at load time:
+
+        table: mem 4096 < "table.bin"
+    """
+
+    # bytes per word in memory files
+
+    def wordsize(self):
+        MM = self.S.MM
+        if isinstance(MM, list): return (self.CFG['BITS']+7)//8
+        return memoryview(MM).itemsize
+
+    # address and size of a label region (the whole memory
+    # when lbl is None, None for an unknown label)
+
+    def region(self, lbl):
+        if lbl is None: return 0, len(self.S.MM)
+        if not lbl.upper() in self.ml.keys():
+            self.log(f"memory error: unknown memory label '{lbl}'")
+            return None
+        return self.ml[lbl.upper()], self.mz[lbl.upper()]
+
+    # read up to n words from the file fn as memory content
+    # (padded with zeros to n words, None on failure)
+
+    def readwords(self, fn, n):
+        w = self.wordsize()
+        try:
+            with open(fn, 'rb') as fh:
+                st = stat(fh.fileno())
+                if st.st_size > n*w or st.st_size % w:
+                    self.log(
+                        f"memory error: file '{fn}' is not" \
+                        f" a list of at most {n} words of {w} bytes")
+                    return None
+                c = memorytype(self.CFG['BITS'])
+                # mmap refuses empty files
+                if st.st_size:
+                    with mmap(fh.fileno(), 0, access = ACCESS_READ) as m:
+                        if isinstance(c, list):
+                            c = [int.from_bytes(m[i:i+w], 'little')
+                                for i in range(0, len(m), w)]
+                        elif isinstance(c, bytearray): c += m
+                        else: c.frombytes(m)
+        except OSError as e:
+            self.log(f"memory error: {e}")
+            return None
+        # words are stored in the machine byte order
+        if byteorder == 'big' and not isinstance(c, (list, bytearray)):
+            c.byteswap()
+        # words wider than BITS in the file are masked
+        M = self.MSK
+        if w*8 > self.CFG['BITS'] and any(x > M for x in c):
+            for i, x in enumerate(c): c[i] = x & M
+        # right padding with zeros
+        if isinstance(c, list): c.extend([0]*(n-len(c)))
+        elif isinstance(c, bytearray): c.extend(bytes(n-len(c)))
+        else: c.frombytes(bytes((n-len(c))*w))
+        self.XF.append((fn, st.st_size, st.st_mtime_ns))
+        return c
+
+    # copy the file fn into the label region (the whole
+    # memory by default), the rest of the region is cleared
+
+    def importMemory(self, fn, lbl = None):
+        r = self.region(lbl)
+        if r is None: return False
+        a, n = r
+        c = self.readwords(fn, n)
+        if c is None: return False
+        # in place: operands remain bound to the memory
+        self.S.MM[a:a+n] = c
+        self.touched(a, n)
+        return True
+
+    # write the label region (the whole memory by default)
+    # to the file fn
+
+    def exportMemory(self, fn, lbl = None):
+        r = self.region(lbl)
+        if r is None: return False
+        a, n = r
+        MM, w = self.S.MM, self.wordsize()
+        if isinstance(MM, list):
+            b = b"".join(x.to_bytes(w, 'little') for x in MM[a:a+n])
+        elif byteorder == 'big' and not isinstance(MM, bytearray):
+            b = MM[a:a+n]
+            b.byteswap()
+        else:
+            b = memoryview(MM)[a:a+n]
+        try:
+            with open(fn, 'wb') as fh: fh.write(b)
+        except OSError as e:
+            self.log(f"memory error: {e}")
+            return False
+        return True
+
+    # the memory files recorded in XF are unchanged
+
+    def fresh(self, XF):
+        for fn, sz, mt in XF:
+            try: st = stat(fn)
+            except OSError: return False
+            if (st.st_size, st.st_mtime_ns) != (sz, mt): return False
+        return True
+
+# ---- ---- ---- ---- load cache
+
+    """ The result of a load (instructions, labels, memory
+    map and initial memory, decoded operands) is recorded
+    in the CACHEDIR directory under a hash of the code, of
+    the configuration parameters used by the load and of
+    the engine source. Loading the same code again skips
+    the parsing, unless a memory file it read has changed.
+    The cache is not used when the loading is traced (LOAD,
+    PARSELINE and NOC debug flags).
+    """
+
+    # configuration parameters used by the load
+
+    CACHECFG = ('VERSION', 'BITS', 'REGS')
+
+    # the recorded load changes with the parser, the decoder
+    # and the handlers: any change of the source is a new load
+
+    CACHESRC = sourcehash(__file__)
+
+    # cache file name of the code s (None: no cache)
+
+    def cachefile(self, s):
+        cd = self.CFG['CACHEDIR']
+        if not cd or self.il: return None
+        if any(self.DBG[k] for k in ('LOAD', 'PARSELINE', 'NOC')):
+            return None
+        h = sha1(s.encode())
+        for k in self.CACHECFG: h.update(f"\0{self.CFG[k]}".encode())
+        h.update(f"\0{self.CACHESRC}".encode())
+        return path.join(cd, f"{h.hexdigest()}.pickle")
+
+    # restore a recorded load (False if there is none)
+
+    def loadcache(self, fn):
+        try:
+            with open(fn, 'rb') as fh: C = pickle.load(fh)
+            if not self.fresh(C['XF']): return False
+        except Exception:
+            return False
+        self.XF = C['XF']
+        self.il, self.ll, self.ml, self.mz = C['il'], C['ll'], C['ml'], C['mz']
+        self.AWM = C['AWM']
+        self.S.extend(len(C['MM']), C['MM'])
+        # decoded instructions: handler and operands access
+        # (bound once all the lines are known: label jumps
+        # skip the no code lines, see target)
+        self.dl = []
+        for opc, args, nx, dst, src, ok in C['dl']:
+            d = instruction(opc, self.handler(opc), args, nx)
+            d.dst, d.src = dst, src
+            if not ok: d.fn = engine.opERR
+            self.dl.append(d)
+        for d in self.dl:
+            if d.fn is not engine.opERR: self.bind(d)
+        self.M0 = self.S.MM[:]
+        return True
+
+    # record the current load
+
+    def savecache(self, fn):
+        C = {
+            'il': self.il, 'll': self.ll, 'ml': self.ml, 'mz': self.mz,
+            'AWM': self.AWM, 'MM': self.S.MM, 'XF': self.XF,
+            'dl': [(d.opc, d.args, d.nx, d.dst, d.src,
+                d.fn is not engine.opERR) for d in self.dl],
+            }
+        # write to a temporary file first (concurrent runs)
+        try:
+            makedirs(self.CFG['CACHEDIR'], exist_ok = True)
+            t = f"{fn}.{getpid()}"
+            with open(t, 'wb') as fh: pickle.dump(C, fh)
+            replace(t, fn)
+        except OSError:
+            pass
+        return
+
+# ---- ---- ---- ---- reset
+
+    # restore the state found after loading: registers
+    # cleared, no pending flags and the initial memory
+    # image. The program, labels and memory map are kept
+    # (memory is restored in place: the operands access
+    # functions remain bound to it).
+
+    def reset(self):
+        S = self.S
+        S.R[:] = [0]*len(S.R)
+        S.F = None
+        if self.M0 is not None:
+            S.MM[:] = self.M0
+            self.touched(0, len(S.MM))
+        self.ip, self.cc = 0, 0
+        self.bk, self.why = None, ""
         # done
+        return
+
+# ---- ---- ---- ---- breakpoints and watchpoints
+
+    """ Breakpoints stop processing before a line is
+    executed, watchpoints after a line has changed a
+    watched register or memory location. Both are set
+    after load; while any is armed (or SS is set to stop
+    on every line) processLines runs the debugLines loop
+    instead of the normal one. On a stop, the onbreak hook
+    is called with the engine: it returns True to continue
+    or False to stop. Without hook, processing stops and
+    resume() continues from the stop position.
+    """
+
+    # set a breakpoint on a line number or a label
+
+    def breakpoint(self, where):
+        if isinstance(where, str):
+            if not where.upper() in self.ll.keys():
+                self.log(f"breakpoint error: unknown label '{where}'")
+                return False
+            where = self.ll[where.upper()]
+        if not 0 < where < len(self.il):
+            self.log(f"breakpoint error: no line {where}")
+            return False
+        # no code lines are skipped: stop on the next line
+        if self.dl[where].opc == "NOC": where = self.dl[where].nx
+        self.BP.add(where)
         return True
 
+    # set a watchpoint on a register, a memory label (the
+    # whole region) or a memory address
+
+    def watchpoint(self, what):
+        R, MM = self.S.R, self.S.MM
+        if isinstance(what, int):
+            if not 0 <= what < len(MM):
+                self.log(f"watchpoint error: no address {what}")
+                return False
+            self.WP[what] = lambda: MM[what]
+            return True
+        w = what.upper()
+        if w in self.RI.keys():
+            r = self.RI[w]
+            # pending flags are written before STATUS is read
+            if r == 0:
+                def f(): self.flush(); return R[0]
+                self.WP[w] = f
+            else:
+                self.WP[w] = lambda: R[r]
+            return True
+        if w in self.ml.keys():
+            a, n = self.ml[w], self.mz[w]
+            self.WP[w] = lambda: MM[a:a+n]
+            return True
+        self.log(f"watchpoint error: unknown register or label '{what}'")
+        return False
+
+    # remove a breakpoint or a watchpoint (all when None)
+
+    def clear(self, where = None):
+        if where is None:
+            self.BP.clear()
+            self.WP.clear()
+            return
+        if isinstance(where, str):
+            w = where.upper()
+            self.WP.pop(w, None)
+            if w in self.ll.keys(): self.BP.discard(self.target(w))
+            return
+        if 0 < where < len(self.dl) and self.dl[where].opc == "NOC":
+            self.BP.discard(self.dl[where].nx)
+        self.BP.discard(where)
+        self.WP.pop(where, None)
+        return
+
+    # stop at line ip and cycle count cc: the state is
+    # written and the hook decides whether to continue
+
+    def stopped(self, ip, cc, why):
+        self.flush()
+        self.flushPorts()
+        self.ip, self.cc = ip, cc
+        self.bk, self.why = (ip, cc), why
+        self.log(f"\n{why} at line {ip}, cycle {cc}.")
+        self.flushLog()
+        if self.onbreak is None: return False
+        return self.onbreak(self)
+
+    # continue processing from the last stop position
+
+    def resume(self):
+        if self.ip >= len(self.il): return
+        self.IW = None
+        self.processLines(self.ip, self.cc)
+        self.flushPorts()
+        return
+
+# ---- ---- ---- ---- snapshots
+
+    """ A snapshot records the machine state at the stop
+    position. Restoring it into an engine loaded with the
+    same program, then calling resume(), continues the run
+    from that position: many runs can be forked from one
+    warmed-up state. The memory is recorded by pages of
+    PAGE words. The memory writers mark the pages they
+    write (state.D): a snapshot copies only these pages
+    and shares the others with the last snapshot taken or
+    restored, and a restore only rewrites these pages and
+    the pages that differ between the two snapshots.
+    """
+
+    # memory page size (words)
+
+    PAGEBITS = 8
+    PAGE = 1 << PAGEBITS
+
+    # mark the pages of the n words from address a written
+
+    def touched(self, a, n):
+        s = self.PAGEBITS
+        if n > 0: self.S.D.update(range(a >> s, ((a+n-1) >> s) + 1))
+        return
+
+    # memory page k (immutable: bytes or tuple of integers)
+
+    def page(self, k):
+        MM, P = self.S.MM, self.PAGE
+        if isinstance(MM, list): return tuple(MM[k*P:(k+1)*P])
+        return memoryview(MM)[k*P:(k+1)*P].tobytes()
+
+    # memory pages: the pages not written since the base
+    # snapshot are shared with it (as are the pages written
+    # back with the same content)
+
+    def pages(self):
+        S, B, P = self.S, self.SB, self.PAGE
+        n = (len(S.MM) + P - 1) // P
+        if B is None or len(B.pages) != n:
+            L = [self.page(k) for k in range(n)]
+        else:
+            L = list(B.pages)
+            for k in S.D:
+                p = self.page(k)
+                if p != L[k]: L[k] = p
+        S.D.clear()
+        return L
+
+    # record the machine state
+
+    def snapshot(self):
+        self.flush()
+        s = snapshot(
+            self.CFG['BITS'], self.S.R[:], self.ip, self.cc, self.pages())
+        self.SB = s
+        return s
+
+    # restore the machine state of the snapshot s (memory
+    # is written in place: operands remain bound to it)
+
+    def restore(self, s):
+        S, MM, B = self.S, self.S.MM, self.SB
+        n = sum(len(p) for p in s.pages)
+        if not isinstance(MM, list): n //= memoryview(MM).itemsize
+        if s.bits != self.CFG['BITS'] or len(s.R) != len(S.R) \
+                or n != len(MM):
+            self.log("restore error: snapshot of a different machine")
+            return False
+        S.R[:], S.F = s.R, None
+        # pages written or different from the base snapshot
+        if B is None or len(B.pages) != len(s.pages):
+            K = range(len(s.pages))
+        else:
+            K = S.D.union(
+                k for k, (p, q) in enumerate(zip(s.pages, B.pages))
+                if p is not q)
+        P = self.PAGE
+        if isinstance(MM, list):
+            for k in K: MM[k*P:k*P+len(s.pages[k])] = s.pages[k]
+        else:
+            v = memoryview(MM)
+            v, w = v.cast('B'), P*v.itemsize
+            for k in K: v[k*w:k*w+len(s.pages[k])] = s.pages[k]
+        S.D.clear()
+        self.ip, self.cc = s.ip, s.cc
+        # the restored position does not break again
+        self.bk, self.why = (s.ip, s.cc), ""
+        self.SB = s
+        return True
+
+    # write the snapshot s to the file fn (compressed)
+
+    def saveSnapshot(self, s, fn):
+        C = {'VERSION': self.CFG['VERSION'],
+            'bits': s.bits, 'R': s.R, 'ip': s.ip, 'cc': s.cc,
+            'pages': s.pages}
+        try:
+            with open(fn, 'wb') as fh: fh.write(zlib.compress(pickle.dumps(C)))
+        except OSError as e:
+            self.log(f"snapshot error: {e}")
+            return False
+        return True
+
+    # read a snapshot from the file fn (None on failure)
+
+    def loadSnapshot(self, fn):
+        try:
+            with open(fn, 'rb') as fh: C = pickle.loads(zlib.decompress(fh.read()))
+        except Exception as e:
+            self.log(f"snapshot error: {e}")
+            return None
+        if C['VERSION'] != self.CFG['VERSION']:
+            self.log(f"snapshot error: engine version {C['VERSION']}")
+            return None
+        return snapshot(C['bits'], C['R'], C['ip'], C['cc'], C['pages'])
+
+# ---- ---- ---- ---- steps
+
+    """ A step runs the program for a number of cycles from
+    the stop position, then stops as if CYCLEMAX had been
+    reached (without the end of cycles message). Repeated
+    steps run the program in slices that can be interleaved
+    with other work (see scheduler). All the backends stop
+    at the same line and cycle count.
+    """
+
+    # cycles limit of the processing loops: CYCLEMAX or the
+    # end of the current step, whichever comes first (0: none,
+    # a step ending at cycle 0 stops after its first line)
+
+    def cyclemax(self):
+        cm, sl = self.CFG['CYCLEMAX'], self.SL
+        if sl is None: return cm
+        sl = sl or -1
+        return min(cm, sl) if cm else sl
+
+    # run from the stop position for n more cycles: True
+    # when the program stopped at the end of the step and can
+    # go on, False on end of code, error, CYCLEMAX, breakpoint
+    # or when waiting for input (IW is set)
+
+    def step(self, n):
+        # the dummy line takes no cycle
+        if self.ip == 0: self.ip = self.dl[0].nx
+        if n < 1 or self.ip >= len(self.il): return False
+        # CYCLEMAX already reached
+        cm = self.CFG['CYCLEMAX']
+        if cm and self.cc > cm: return False
+        # the loops stop when the cycle count passes SL
+        sl = self.cc + n
+        self.SL = sl - 1
+        self.IW = None
+        try:
+            self.processLines(self.ip, self.cc)
+        finally:
+            self.SL = None
+        self.flushPorts()
+        if self.ip >= len(self.il) or cm and self.cc > cm: return False
+        return self.cc >= sl
+
 # ---- ---- ---- ---- engine processor
 
-    # process lines one by one (first pass required using load)
+    # process decoded lines one by one (first pass required using load)
     def processCode(self):
-        # cycles
-        cc, cm = 0, self.CFG['CYCLEMAX']
-        # instruction pointer
-        r, ip = True, 0
         # formats
         t = f"{'':2}"
         # display
-        self.log(f"\nstart processing:")
-        self.log(f" line{t}cycles{t}instruction")
-        self.log(f" ----{t}------{t}-----------")
+        self.info(f"\nstart processing:")
+        self.info(f" line{t}cycles{t}instruction")
+        self.info(f" ----{t}------{t}-----------")
+        # start at the dummy line with no cycles
+        self.processLines(0, 0)
+        self.flushPorts()
+        # done
+        return
+
+    # process decoded lines from line ip and cycle count cc
+    def processLines(self, ip, cc):
+        # handlers for the debug flags set
+        self.dispatch()
+        # breakpoints and watchpoints
+        if self.BP or self.WP or self.SS:
+            # the debug loop does not record nor profile
+            for k in ("TRACEFILE", "PROFILE"):
+                if self.CFG[k]: self.log(f"{k} ignored while debugging.")
+            return self.debugLines(ip, cc)
+        # binary trace
+        if self.CFG['TRACEFILE']: return self.recordLines(ip, cc)
+        # profile
+        if self.CFG['PROFILE']: return self.profileLines(ip, cc)
+        # cycles limit
+        cm = self.cyclemax()
+        # formats
+        r, t = True, f"{'':2}"
+        # decoded instructions, end of code
+        dl, n = self.dl, len(self.il)
+        # header needed (the release handlers do not use it)
+        hd = any(v for k, v in self.DBG.items() if k.startswith("op"))
         # while successfull, continue processing
         while r:
-            # label and opcode already checked during loading
-            lbl, opc, args = self.parseLine(self.il[ip], ip)
+            # lines are already parsed and decoded during loading
+            d = dl[ip]
             # header
-            h = f" {ip:04}{t}{cc:06}{t}"
-            # execute and display
-            r, ip, cc = self.OPCODES[opc](self, args, ip, cc, h)
+            h = f" {ip:04}{t}{cc:06}{t}" if hd else ""
+            # execute and display (stop before a line waiting for input)
+            try:
+                r, ip, cc = d.fn(self, d, ip, cc, h)
+            except starved as e:
+                self.waiting(ip, cc, e.args[0])
+                break
             # interupt on failure
             if not r:
                 self.log(f"error while running code at line {ip-1}.")
                 self.log(f"exiting...")
+                self.flush()
+                self.ip, self.cc = ip-1, cc
                 return
             # break on last instruction
-            if ip == len(self.il):
+            if ip == n:
                 self.log(f"\nreached end of code.")
                 r = False 
             # break on limit reached
             if cm:
                 if cc > cm:
-                    self.log(f"\n\nreached end of cycles.")
+                    if cm == self.CFG['CYCLEMAX']:
+                        self.log(f"\n\nreached end of cycles.")
+                    r = False
+        # write pending flags
+        self.flush()
+        # stop position
+        self.ip, self.cc = ip, cc
+        # done
+        return
+
+    # process decoded lines, writing a binary trace record
+    # for each line executed (see tracefile). The lines are
+    # processed by the profile loop, which also writes the
+    # profile report when one is requested.
+    def recordLines(self, ip, cc):
+        # registers at the start of the trace
+        self.flush()
+        # program description (see tracefile.formatter)
+        P = {'opcodes': list(self.OPCODES), 'registers': self.RN,
+            'lines': [(d.dst, d.src) for d in self.dl],
+            'labels': self.ll, 'memory': self.ml, 'start': self.S.R[:]}
+        # trace file
+        tr = recorder(
+            self.CFG['TRACEFILE'], self.CFG['BITS'], P,
+            self.CFG['TRACEBUFFER'])
+        # the trace is closed even if the program crashes
+        try:
+            self.profileLines(ip, cc, tr)
+        finally:
+            tr.close()
+        # done
+        return
+
+    # process decoded lines, counting the executions, the
+    # cycles and the time of each line and the backward jumps
+    # taken, then write the profile report (see profiler).
+    # Each line is also written to the trace recorder tr.
+    def profileLines(self, ip, cc, tr = None):
+        # cycles limit
+        cm = self.cyclemax()
+        # formats
+        r, t = True, f"{'':2}"
+        # decoded instructions, end of code, state
+        dl, n, S, R = self.dl, len(self.il), self.S, self.S.R
+        # opcode numbers, operands locations and values
+        if tr:
+            ON = {o: i for i, o in enumerate(self.OPCODES)}
+            L = [self.locator(d.src if d.opc == "DSP" else d.dst)
+                for d in dl]
+            LS = [None if d.opc == "DSP" else self.locator(d.src)
+                for d in dl]
+            # constant and register list sources (no location)
+            SV = [d.opc != "DSP" and d.src is not None
+                and LS[i] is None and d.rd is not None
+                for i, d in enumerate(dl)]
+            val = lambda l: R[l[1]] if l[0] == 1 else S.MM[l[1]]
+        # counts, cycles and times of each line, backward jumps
+        N, C, T, J = [0]*len(dl), [0]*len(dl), [0]*len(dl), {}
+        # profile and time sampling
+        pf = self.CFG['PROFILE']
+        pt = perf_counter_ns if pf and self.CFG['PROFILETIME'] else None
+        # header needed
+        hd = any(v for k, v in self.DBG.items() if k.startswith("op"))
+        # while successfull, continue processing
+        while r:
+            d, i, c = dl[ip], ip, cc
+            # header
+            h = f" {ip:04}{t}{cc:06}{t}" if hd else ""
+            # locations and values before the line (recorded)
+            if tr and d.opc != "NOC":
+                ld = L[i]() if L[i] else None
+                ls = LS[i]() if LS[i] else None
+                x = 0 if ld is None else val(ld)
+                y = d.rd() if SV[i] else 0
+            # execute (stop before a line waiting for input)
+            try:
+                if pt:
+                    t0 = pt()
+                    r, ip, cc = d.fn(self, d, ip, cc, h)
+                    T[i] += pt() - t0
+                else:
+                    r, ip, cc = d.fn(self, d, ip, cc, h)
+            except starved as e:
+                self.waiting(ip, cc, e.args[0])
+                break
+            # interupt on failure
+            if not r:
+                self.log(f"error while running code at line {ip-1}.")
+                self.log(f"exiting...")
+                ip = ip-1
+                break
+            # count
+            N[i] += 1
+            C[i] += cc - c
+            if ip <= i: J[i, ip] = J.get((i, ip), 0) + 1
+            # record (lines without code are not recorded)
+            if tr and d.opc != "NOC":
+                # STATUS is recorded with every line
+                if S.F is not None: self.flush()
+                # jumps: next line and jump taken
+                if d.opc in ("JMP", "JNZ", "JZE"):
+                    k, a, v = 3, ip, d.opc == "JMP" or ip != d.nx
+                # destination (or displayed operand)
+                elif ld is not None:
+                    (k, a), v = ld, val(ld)
+                else:
+                    k, a, v = 0, 0, 0
+                # source read (the destination when the same)
+                if ls is not None: y = x if ls == ld else val(ls)
+                tr.write(i, c, ON[d.opc], k, a, v, R[0], x, y)
+            # break on last instruction
+            if ip == n:
+                self.log(f"\nreached end of code.")
+                r = False
+            # break on limit reached
+            if cm:
+                if cc > cm:
+                    if cm == self.CFG['CYCLEMAX']:
+                        self.log(f"\n\nreached end of cycles.")
                     r = False
+        # write pending flags
+        self.flush()
+        # stop position
+        self.ip, self.cc = ip, cc
+        # report (the dummy line 0 is not counted)
+        N[0], C[0], T[0] = 0, 0, 0
+        if pf: report(self, pf, N, C, T, J)
         # done
         return
 
+    # process decoded lines, stopping on breakpoints and
+    # watchpoints (the stop position does not break again
+    # when processing resumes from it)
+    def debugLines(self, ip, cc):
+        # cycles limit
+        cm = self.cyclemax()
+        # formats
+        r, t = True, f"{'':2}"
+        # decoded instructions, end of code, breakpoints
+        dl, n, B = self.dl, len(self.il), self.BP
+        # watched values
+        W = {w: f() for w, f in self.WP.items()}
+        # while successfull, continue processing
+        while r:
+            # breakpoint
+            if (ip in B or self.SS) and (ip, cc) != self.bk:
+                why = "step" if self.SS else "breakpoint"
+                if not self.stopped(ip, cc, why): return
+                # the hook may have changed the watchpoints
+                W = {w: f() for w, f in self.WP.items()}
+            d = dl[ip]
+            # header
+            h = f" {ip:04}{t}{cc:06}{t}"
+            # execute and display (stop before a line waiting for input)
+            try:
+                r, ip, cc = d.fn(self, d, ip, cc, h)
+            except starved as e:
+                self.waiting(ip, cc, e.args[0])
+                break
+            # interupt on failure
+            if not r:
+                self.log(f"error while running code at line {ip-1}.")
+                self.log(f"exiting...")
+                self.flush()
+                self.ip, self.cc = ip-1, cc
+                return
+            # watchpoints
+            C = [str(w) for w, v in W.items() if self.WP[w]() != v]
+            if C:
+                why = f"watchpoint {', '.join(C)} changed"
+                if not self.stopped(ip, cc, why): return
+                W = {w: f() for w, f in self.WP.items()}
+            # break on last instruction
+            if ip == n:
+                self.log(f"\nreached end of code.")
+                r = False
+            # break on limit reached
+            if cm:
+                if cc > cm:
+                    if cm == self.CFG['CYCLEMAX']:
+                        self.log(f"\n\nreached end of cycles.")
+                    r = False
+        # write pending flags
+        self.flush()
+        # stop position
+        self.ip, self.cc = ip, cc
+        # done
+        return
+
+    # the interpreter is needed for traces (text or binary),
+    # profiles, breakpoints and I/O ports: the compiled
+    # backends hand over to it
+
+    def interpreted(self):
+        if self.BP or self.WP or self.SS or self.IO: return True
+        if self.CFG['TRACEFILE'] or self.CFG['PROFILE']: return True
+        return any(v for k, v in self.DBG.items() if k.startswith("op"))
+
 if __name__ == "__main__":
 
     from os import system
@@ -1252,12 +2674,6 @@ if __name__ == "__main__":
 
 - systematically check all EndOfString parsing.
 
-- import/export memory from/to file
-
-- you cannot imput file during execution but
-you can merge several files during loading:
-add extra headers (file name?) to labels
-
 - how to use flag bits values: use flag
 names in syntax: define new syntax.
 
@@ -0,0 +1,154 @@
+#!/usr/bin/python3
+# file: ioport.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Memory-mapped I/O ports. A port is a memory address
+where a read takes the next word of an input stream and
+a write sends the word to an output stream (the memory
+word keeps the last word read or written). Words are
+exchanged with the streams in bulk buffers.
+
+An input stream is a binary file or pipe (raw words as
+in memory files, see engine.readwords), an iterable of
+words or an asyncio queue of words or lists of words
+(None closes the stream). An output stream is a binary
+file or pipe, a list or an asyncio queue (receiving
+lists of words). Reads past the end of an input stream
+give 0. A read from an empty asyncio queue stops the
+processing before the line (see engine.port): the line
+runs again when processing resumes.
+"""
+
+# standard modules
+from asyncio import Queue, QueueEmpty
+from array import array
+from sys import byteorder
+
+# words read or written at once
+BUFFER = 4096
+
+# array types of the words of 1, 2, 4 and 8 bytes
+TYPES = {array(t).itemsize: t for t in "QLIHB"}
+
+# an empty asyncio queue was read
+class starved(Exception):
+    pass
+
+# an I/O port
+
+class ioport():
+
+    """ The port at address a of engine E, with an input
+    stream, an output stream or both. The output buffer
+    is written when it is full and when processing stops
+    (see engine.flushPorts).
+    """
+
+    def __init__(self, E, a, input = None, output = None):
+        self.a, self.src, self.dst = a, input, output
+        self.w, self.M = E.wordsize(), E.MSK
+        # input iterator, buffer and position, end of input
+        self.it = None
+        if input is not None and not isinstance(input, Queue) \
+                and not hasattr(input, "read"):
+            self.it = iter(input)
+        self.ib, self.ip, self.eof = [], 0, input is None
+        # partial word of a pipe
+        self.rb = b""
+        # output buffer
+        self.ob = []
+        return
+
+# ---- ---- ---- ---- input
+
+    # next input word
+    def read(self):
+        if self.ip == len(self.ib) and not self.fill(): return 0
+        v = self.ib[self.ip]
+        self.ip += 1
+        return v & self.M
+
+    # words of the bytes b (the machine words are little-endian)
+    def words(self, b):
+        t = TYPES.get(self.w)
+        if t is None:
+            w = self.w
+            return [int.from_bytes(b[i:i+w], 'little')
+                for i in range(0, len(b), w)]
+        c = array(t, b)
+        if byteorder == 'big': c.byteswap()
+        return c
+
+    # refill the input buffer: False at the end of input,
+    # starved for an empty queue
+    def fill(self):
+        self.ib, self.ip = [], 0
+        if self.eof: return False
+        s = self.src
+        # asyncio queue
+        if isinstance(s, Queue):
+            L = []
+            while len(L) < BUFFER:
+                try: x = s.get_nowait()
+                except QueueEmpty: break
+                if x is None:
+                    self.eof = True
+                    break
+                if isinstance(x, int): L.append(x)
+                else: L.extend(x)
+            if not L and not self.eof: raise starved(self.a)
+            self.ib = L
+        # iterable
+        elif self.it is not None:
+            L = []
+            for x in self.it:
+                L.append(x)
+                if len(L) == BUFFER: break
+            else:
+                self.eof = True
+            self.ib = L
+        # file or pipe (read1 does not wait for a full buffer)
+        else:
+            rd = getattr(s, "read1", s.read)
+            b = self.rb + rd(BUFFER*self.w)
+            if len(b) == len(self.rb): self.eof = True
+            n = len(b) - len(b) % self.w
+            self.ib, self.rb = self.words(b[:n]), b[n:]
+            if not self.ib and not self.eof: return self.fill()
+        return len(self.ib) > 0
+
+    # wait for the next item of an input queue
+    async def wait(self):
+        x = await self.src.get()
+        self.ib, self.ip = [], 0
+        if x is None: self.eof = True
+        elif isinstance(x, int): self.ib = [x]
+        else: self.ib = list(x)
+        return
+
+# ---- ---- ---- ---- output
+
+    # send an output word
+    def write(self, v):
+        self.ob.append(v)
+        if len(self.ob) == BUFFER: self.flush()
+        return
+
+    # write the output buffer to the output stream
+    def flush(self):
+        L, d = self.ob, self.dst
+        if not L or d is None: return
+        self.ob = []
+        if isinstance(d, Queue): d.put_nowait(L)
+        elif isinstance(d, list): d.extend(L)
+        else:
+            t = TYPES.get(self.w)
+            if t is None:
+                d.write(b"".join(x.to_bytes(self.w, 'little') for x in L))
+            else:
+                c = array(t, L)
+                if byteorder == 'big': c.byteswap()
+                d.write(c.tobytes())
+        return
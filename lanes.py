@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+# file: lanes.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Run one program over many inputs at once. Registers
+and memory are NumPy arrays with one column per lane
+(one lane per input) and every opcode is computed for
+all the lanes of a group at once. Lanes start as one
+group; a conditional or computed jump splits a group
+whose lanes disagree and groups meeting again at the
+same line and cycle count are merged.
+
+NumPy is optional: without it the lanes engine only
+reports an error.
+"""
+
+# standard modules
+from heapq import heappush, heappop
+
+# optional modules
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# local classes and functions
+from engine__004 import engine
+
+# the lanes engine
+
+class lanes(engine):
+
+    """ An engine running n copies of the loaded program
+    in lockstep. After load, setLanes(n) copies the
+    initial registers and memory into every lane, then
+    setRegister and setMemory give each lane its input.
+    processCode runs all the lanes. For each lane, the
+    results are the columns of LR (registers) and LM
+    (memory), LIP and LCC (line and cycle count where
+    the lane stopped), END ("code", "cycles" or "error")
+    and OUT (its DSP lines).
+    """
+
+    # lanes count
+    LN = 0
+
+    # copy the machine state into n lanes
+    def setLanes(self, n):
+        if np is None:
+            self.log("lanes error: numpy is not installed")
+            return False
+        # python integers for words wider than int64 arithmetics
+        dt = np.int64 if self.CFG['BITS'] <= 62 else object
+        self.flush()
+        self.LN = n
+        self.LR = np.array(self.S.R, dt)[:, None].repeat(n, 1)
+        self.LM = np.array(list(self.S.MM), dt).reshape(-1, 1).repeat(n, 1)
+        self.LIP, self.LCC = np.zeros(n, int), np.zeros(n, int)
+        self.END, self.OUT = [None]*n, [[] for i in range(n)]
+        return True
+
+    # set register r of every lane (v: value or one per lane)
+    def setRegister(self, r, v):
+        self.LR[self.RI[r.upper()]] = np.asarray(v) & self.MSK
+        return
+
+    # set memory from address or label a (v: words or one
+    # column of words per lane)
+    def setMemory(self, a, v):
+        if isinstance(a, str): a = self.ml[a.upper()]
+        v = np.asarray(v) & self.MSK
+        self.LM[a:a+len(v)] = v if v.ndim == 2 else v[:, None]
+        return
+
+# ---- ---- ---- ---- lanes operands
+
+    # build a function returning the operand value of lanes ix
+    def vreader(self, op):
+        R, M, k = self.LR, self.LM, op[0]
+        if k == "IMM": v = op[1]
+        elif k == "LBL": v = self.lblval(op)
+        elif k == "LIN": v = self.target(op[1])
+        elif k == "REG":
+            r = self.RI[op[1]]
+            return lambda ix: R[r, ix]
+        elif k == "RLS":
+            W = [(self.RI[r], self.CB**i) for i, r in enumerate(op[1])]
+            return lambda ix: sum(R[r, ix]*w for r, w in W)
+        elif k == "MEM":
+            f = self.vaddress(op)
+            return lambda ix: M[f(ix), ix]
+        else:
+            a = op[1]
+            a = a[1] & self.AWM if a[0] == "IMM" else self.lblval(a)
+            return lambda ix: M[a, ix]
+        return lambda ix: v
+
+    # build a function writing the operand value of lanes ix
+    def vwriter(self, op):
+        R, M = self.LR, self.LM
+        if op[0] == "REG":
+            r = self.RI[op[1]]
+            def w(ix, v): R[r, ix] = v
+            return w
+        f, K = self.vaddress(op), self.MSK
+        def w(ix, v): M[f(ix), ix] = v & K
+        return w
+
+    # build a function returning the memory addresses of lanes
+    # ix for a register list address (as an index array)
+    def vaddress(self, op):
+        f, A = self.vreader(("RLS", op[1])), self.AWM
+        return lambda ix: (f(ix) & A).astype(np.intp)
+
+# ---- ---- ---- ---- lanes opcodes
+
+    # build the function running instruction d on lanes ix:
+    # it returns the next line (one per lane for jumps) or
+    # None for a run-time error
+    def vop(self, d):
+        o, R = d.opc, self.LR
+        B, K, H = self.CFG['BITS'], self.MSK, self.MSB
+        if d.fn is engine.opERR or o == "MEM": return None
+        # flags N and Z of z
+        def zn(z): return ((z & H) != 0) * 8 | (z == 0) * 4
+        if o in ("NOC", "NOP"): return lambda ix: d.nx
+        if o == "DSP":
+            rd, op = self.vreader(d.src), d.src
+            def f(ix, ip, cc):
+                v, h = rd(ix), f" {ip:04}  {cc:06}  "
+                for j, x in zip(ix, v): self.OUT[j].append(h + self.dspfm(op, j, x))
+                return d.nx
+            return f
+        if o in ("JMP", "JNZ", "JZE"):
+            t = self.vreader(d.dst)
+            if o == "JMP": return lambda ix: t(ix)
+            c = o == "JZE"
+            return lambda ix: np.where(
+                ((R[0, ix] & 4) != 0) == c, t(ix), d.nx)
+        rx, wr = self.vreader(d.dst), self.vwriter(d.dst)
+        if o == "XFR":
+            rd = self.vreader(d.src)
+            def f(ix): wr(ix, rd(ix)); return d.nx
+            return f
+        if o == "ADC":
+            rd = self.vreader(d.src)
+            def f(ix):
+                x, y, s = rx(ix), rd(ix), R[0, ix]
+                z = x + y + (s & 1)
+                c, v = (z >> B) & 1, ((x ^ z) & (y ^ z) & H) != 0
+                z = z & K
+                R[0, ix] = s & ~15 | zn(z) | v * 2 | c
+                wr(ix, z)
+                return d.nx
+            return f
+        if o == "SHR":
+            def f(ix):
+                x, s = rx(ix), R[0, ix]
+                z = (x >> 1) + (s & 1) * H
+                R[0, ix] = s & ~13 | zn(z) | (x & 1)
+                wr(ix, z)
+                return d.nx
+            return f
+        if o == "SHL":
+            def f(ix):
+                x, s = rx(ix), R[0, ix]
+                z = (x << 1 & K) + (s & 1)
+                R[0, ix] = s & ~13 | zn(z) | ((x & H) != 0)
+                wr(ix, z)
+                return d.nx
+            return f
+        # logic
+        rd, g = self.vreader(d.src), {
+            "AND": np.bitwise_and, "IOR": np.bitwise_or,
+            "EOR": np.bitwise_xor}[o]
+        def f(ix):
+            z = g(rx(ix), rd(ix))
+            R[0, ix] = R[0, ix] & ~12 | zn(z)
+            wr(ix, z)
+            return d.nx
+        return f
+
+    # DSP text of lane j (value x)
+    def dspfm(self, op, j, x):
+        R, I = self.LR, self.RI
+        if op[0] == "REG":
+            if op[1] == "STATUS":
+                s = "".join(
+                    f if x & w else "." for f, w in self.FLAGS.items())
+                return f"STATUS:{s}"
+            return f"{op[1]}:{self.usfm(int(x))}"
+        if op[0] == "MEM":
+            m = ", ".join(f"{r}:{R[I[r], j]}" for r in op[1])
+            return f"[{m}]:{self.usfm(int(x))}"
+        return f"{self.adrfm(op)}:{self.usfm(int(x))}"
+
+# ---- ---- ---- ---- lanes processor
+
+    # run all the lanes from the first line
+    def processCode(self):
+        if not self.LN and not self.setLanes(1): return
+        # cycles limit, end of code, lanes operations
+        cm, n = self.CFG['CYCLEMAX'], len(self.il)
+        F = [self.vop(d) for d in self.dl]
+        J = {"JMP", "JNZ", "JZE"}
+        # stop lanes ix at line ip and cycle cc
+        def stop(ix, ip, cc, e):
+            self.LIP[ix], self.LCC[ix] = ip, cc
+            for j in ix: self.END[j] = e
+        # groups of lanes (cycles, line, number, lanes)
+        G, k = [(0, 0, 0, np.arange(self.LN))], 1
+        while G:
+            cc, ip, i, ix = heappop(G)
+            # merge with the groups at the same line and cycle
+            while G and G[0][:2] == (cc, ip):
+                ix = np.concatenate((ix, heappop(G)[3]))
+            # run the group up to the next jump
+            while True:
+                d, f = self.dl[ip], F[ip]
+                if f is None:
+                    h, m = f" {ip:04}  {cc:06}  ", None
+                    if d.opc == "MEM":
+                        m = f"{h}MEM error: MEM is not an executable instruction"
+                    elif d.opc in self.ERRMSG:
+                        m = self.ERRMSG[d.opc].format(h = h)
+                    if m:
+                        for j in ix: self.OUT[j].append(m)
+                    stop(ix, ip, cc, "error")
+                    break
+                # lanes addressing outside memory stop with an error
+                try:
+                    if d.opc == "DSP": t = f(ix, ip, cc)
+                    else: t = f(ix)
+                except IndexError:
+                    m = f" {ip:04}  {cc:06}  memory error: address out of range"
+                    for j in ix: self.OUT[j].append(m)
+                    stop(ix, ip, cc, "error")
+                    break
+                if d.opc not in ("NOC", "DSP"): cc += 1
+                # jump: split the lanes by target
+                if d.opc in J:
+                    t = np.broadcast_to(t, ix.shape)
+                    for u in np.unique(t):
+                        s = ix[t == u]
+                        if cm and cc > cm: stop(s, int(u), cc, "cycles")
+                        elif u == n: stop(s, n, cc, "code")
+                        elif u > n: stop(s, ip, cc, "error")
+                        else:
+                            heappush(G, (cc, int(u), k, s))
+                            k += 1
+                    break
+                ip = t
+                if cm and cc > cm:
+                    stop(ix, ip, cc, "cycles")
+                    break
+                if ip == n:
+                    stop(ix, ip, cc, "code")
+                    break
+        # done
+        return
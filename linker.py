@@ -0,0 +1,192 @@
+#!/usr/bin/python3
+# file: linker.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Load several .machine files into one engine. Each file
+is parsed once into an object unit: its lines, its own
+labels (line numbers from the start of the unit), its
+memory allocations and their content. Units are cached
+in CACHEDIR and only the files that changed are parsed
+again. Linking places the units one after the other in
+the code and in the memory and decodes their operands.
+Running off the last line of a unit ends the code.
+
+The labels of the first unit (the main program) keep
+their names. The labels of the other units are named
+after the unit: label ADD of the file math.machine is
+MATH_ADD. In a unit, a reference is first looked up
+among its own labels, then among the linked names.
+
+usage: linker.py main.machine [unit.machine ...]
+"""
+
+# standard modules
+from hashlib import sha1
+from os import path, makedirs, replace, getpid
+import pickle, re
+
+# local classes and functions
+from engine__004 import engine, instruction, sourcehash
+
+# object unit
+
+class unit():
+
+    """ A parsed file: name, lines, labels, memory map
+    and sizes (addresses from the start of the unit),
+    memory content, (opcode, arguments) of each line and
+    the memory files read (see engine.readwords).
+    """
+
+    __slots__ = ('name', 'il', 'll', 'ml', 'mz', 'MM', 'ol', 'xf')
+
+    def __init__(self, name):
+        self.name, self.il, self.ll = name, [], {}
+        self.ml, self.mz, self.MM, self.ol = {}, {}, [], []
+        self.xf = []
+        return
+
+# hash of the sources making a unit
+UNITSRC = sourcehash(__file__)
+
+# unit name of a file: the file name as an identifier
+def unitname(fp):
+    n = path.splitext(path.basename(fp))[0]
+    return re.sub("[^A-Z0-9_]", "_", n.upper())
+
+# parse the code s into a unit (None on failure)
+def compileUnit(E, name, s):
+    U, k = unit(name), len(E.XF)
+    U.il = s.split("\n")
+    for i, l in enumerate(U.il, 1):
+        # parse
+        lbl, opc, args = E.parseLine(l, i)
+        if opc == "FAIL":
+            E.log(f"\nparse error while loading unit {name}.")
+            E.log(f"failed to parse opcode at line {i}.")
+            E.log(f"{args}")
+            return None
+        U.ol.append((opc, args))
+        # labels
+        if not lbl: continue
+        if lbl in U.ll:
+            E.log(
+                f"Duplicate reference '{lbl}' in unit {name} " \
+                f"at lines {U.ll[lbl]} & {i}")
+            return None
+        U.ll[lbl] = i
+        # memory allocation
+        if opc == "MEM":
+            a = E.memargs(args)
+            if a is None:
+                E.log(f"allocation failed in unit {name}")
+                return None
+            n, c = a
+            U.ml[lbl], U.mz[lbl] = len(U.MM), n
+            U.MM.extend([0]*n if c is None else c)
+    U.xf = E.XF[k:]
+    return U
+
+# unit of the file fp, from the cache when possible
+def loadUnit(E, fp):
+    name, s = unitname(fp), open(fp).read()
+    # cache file
+    cd, cf = E.CFG['CACHEDIR'], None
+    if cd:
+        h = sha1(f"unit\0{name}\0{s}".encode())
+        for k in E.CACHECFG: h.update(f"\0{E.CFG[k]}".encode())
+        h.update(f"\0{E.CACHESRC}\0{UNITSRC}".encode())
+        cf = path.join(cd, f"{h.hexdigest()}.unit")
+        try:
+            with open(cf, 'rb') as fh: U = pickle.load(fh)
+            if E.fresh(U.xf): return U
+        except Exception:
+            pass
+    # parse
+    U = compileUnit(E, name, s)
+    # record
+    if U is not None and cf:
+        try:
+            makedirs(cd, exist_ok = True)
+            t = f"{cf}.{getpid()}"
+            with open(t, 'wb') as fh: pickle.dump(U, fh)
+            replace(t, cf)
+        except OSError:
+            pass
+    return U
+
+# names of the labels of a unit operand
+def qualify(op, Q):
+    if op is None: return None
+    k = op[0]
+    if k == "LBL": return (k, Q.get(op[1], op[1])) + op[2:]
+    if k == "LIN": return (k, Q.get(op[1], op[1]))
+    if k == "ADR": return (k, qualify(op[1], Q))
+    return op
+
+# link units into the engine E (freshly created)
+def link(E, units):
+    dl = E.DBG['LOAD']
+    # code and memory layout
+    E.il = [""]
+    E.dl = [instruction("NOC", E.OPCODES["NOC"], "\0", 1)]
+    G, L, M, Z = [], {}, {}, {}
+    for k, U in enumerate(units):
+        o, b = len(E.il)-1, len(E.S.MM)
+        # linked names of the unit labels
+        Q = {l: l if k == 0 else f"{U.name}_{l}" for l in U.ll}
+        for l, q in Q.items():
+            if q in L:
+                E.log(f"Duplicate reference '{q}' linking unit {U.name}")
+                return False
+            L[q] = U.ll[l] + o
+            if l in U.ml: M[q], Z[q] = U.ml[l] + b, U.mz[l]
+        G.append((o, b, Q))
+        if dl: E.info(f"link unit {U.name} at line {o+1}, address {b}")
+        # code and memory
+        E.il += U.il
+        for i, (opc, args) in enumerate(U.ol, o+1):
+            E.dl.append(instruction(opc, E.OPCODES[opc], args, i+1))
+        E.S.extend(len(U.MM), U.MM)
+        # the unit ends the code
+        E.EL.add(len(E.il)-1)
+    E.skipLines()
+    E.addressMask()
+    # decode each unit with its own labels first
+    for U, (o, b, Q) in zip(units, G):
+        E.ll, E.ml, E.mz = dict(L), dict(M), dict(Z)
+        for l, q in Q.items():
+            E.ll[l] = L[q]
+            if q in M: E.ml[l], E.mz[l] = M[q], Z[q]
+        for d in E.dl[o+1:o+1+len(U.ol)]:
+            if E.decode(d): E.bind(d)
+            d.dst, d.src = qualify(d.dst, Q), qualify(d.src, Q)
+    # linked labels
+    E.ll, E.ml, E.mz = L, M, Z
+    E.M0 = E.S.MM[:]
+    return True
+
+# load the files fp into the engine E
+def loadFiles(E, files):
+    units = []
+    for fp in files:
+        U = loadUnit(E, fp)
+        if U is None: return False
+        units.append(U)
+    return link(E, units) and E.optimizeCode()
+
+if __name__ == "__main__":
+
+    from sys import argv, exit
+
+    if len(argv) < 2:
+        print(__doc__.split("usage: ")[1].strip())
+        exit(1)
+
+    # units are pickled from the module (not from __main__)
+    import linker
+
+    E = engine([], "./engine.cfg")
+    if linker.loadFiles(E, argv[1:]): E.processCode()
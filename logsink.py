@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+# file: logsink.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Log destinations for the core engine. A sink receives
+text and writes it to a stream (the console or a file)
+in blocks of a configurable size. A threaded writer can
+be placed between a sink and its stream: the text blocks
+are then written by a background thread fed by a queue.
+"""
+
+# standard modules
+from threading import Thread
+from queue import SimpleQueue
+import sys
+
+# console stream
+
+class console():
+
+    """ The standard output current when the text is
+    written: redirections of sys.stdout (redirect_stdout,
+    captured output) are followed.
+    """
+
+    def write(self, s):
+        sys.stdout.write(s)
+        return
+
+    def flush(self):
+        sys.stdout.flush()
+        return
+
+# buffered text sink
+
+class sink():
+
+    """ Collect text and write it to the stream fh once
+    size characters are buffered (size 0 writes every
+    message). The stream is closed with the sink when
+    close is True.
+    """
+
+    def __init__(self, fh, size = 0, close = False):
+        self.fh, self.size, self.cl = fh, size, close
+        self.bf, self.n = [], 0
+        return
+
+    def write(self, s):
+        self.bf.append(s)
+        self.n += len(s)
+        if self.n >= self.size: self.flush()
+        return
+
+    def flush(self):
+        if self.bf:
+            self.fh.write("".join(self.bf))
+            self.bf, self.n = [], 0
+        self.fh.flush()
+        return
+
+    def close(self):
+        self.flush()
+        if self.cl: self.fh.close()
+        return
+
+# background writer
+
+class writer():
+
+    """ Write text to the stream fh from a background
+    thread. It behaves as a stream: write, flush and
+    close are queued and executed in order.
+    """
+
+    def __init__(self, fh):
+        self.fh, self.q = fh, SimpleQueue()
+        self.t = Thread(target = self.run, daemon = True)
+        self.t.start()
+        return
+
+    # writer thread
+    def run(self):
+        while True:
+            c, s = self.q.get()
+            if c == "W": self.fh.write(s)
+            if c == "F": self.fh.flush()
+            if c == "C":
+                self.fh.close()
+                return
+
+    def write(self, s):
+        self.q.put(("W", s))
+        return
+
+    def flush(self):
+        self.q.put(("F", None))
+        return
+
+    # wait for the thread to write everything
+    def close(self):
+        self.q.put(("C", None))
+        self.t.join()
+        return
@@ -24,6 +24,12 @@ DBG = [
 
 fp = "./code.machine"
 
+# engine backend: "interpreter", "compiler" or "tracejit"
+# (the compiler and the tracejit fall back to the interpreter
+# when any opcode debug flag above is set)
+
+BE = "interpreter"
+
 #######################################################
 
 from sys import argv
@@ -41,9 +47,19 @@ en = l0[2:]					# engine name
 if en == "./engine__003.py": from engine.engine__003 import engine
 if en == "./engine__004.py": from engine__004 import engine
 
+if en == "./engine__004.py" and BE == "compiler":
+	from compiler import compiler as engine
+
+if en == "./engine__004.py" and BE == "tracejit":
+	from tracejit import tracejit as engine
+
 # instanciate engine
 EGN = engine(DBG, fc)
-# load machine code
-if EGN.load(ft):
-	# run machine code
-	EGN.processCode()
+# load machine code (extra files are linked after the first)
+if len(argv) > 2 and en == "./engine__004.py":
+	from linker import loadFiles
+	ok = loadFiles(EGN, argv[1:])
+else:
+	ok = EGN.load(ft)
+# run machine code
+if ok: EGN.processCode()
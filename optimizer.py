@@ -0,0 +1,427 @@
+#!/usr/bin/python3
+# file: optimizer.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Static analysis and optimization of a loaded program
+(OPTIMIZE set in the configuration). The control flow
+graph follows the jumps, register jumps included: their
+targets are the values the registers can hold, any line
+when these are unknown. A forward pass computes the
+values each register can hold (a few constants or
+unknown) and the registers holding a copy of another
+one, a backward pass the registers and flags read
+later. The decoded program is then rewritten:
+
+    - unreachable lines are removed
+    - conditional jumps on a known Z flag become JMP or
+      are removed, register jumps to a known line jump
+      to that line
+    - register sources holding a constant become
+      immediates, copies read the original register
+    - transfers of the value a register already holds
+      are removed
+    - instructions whose registers and flags are never
+      read are removed, a constant result whose flags
+      are never read becomes a transfer
+    - flags never read are not computed
+
+Removed lines become no code lines (skipped, see
+engine.skipLines): the line numbers are unchanged.
+Memory is not analysed: the instructions reading or
+writing memory (possibly I/O ports) are kept. The
+registers are unknown at the start (inputs, restored
+snapshots). The optimized program takes fewer cycles:
+verify runs both programs to compare their final
+registers and memory.
+
+usage: optimizer.py [-c cfg] [-b backend] [-m cycles] [-v] file
+"""
+
+# standard modules
+from itertools import product
+
+# most constants a register value can hold before it
+# is unknown
+VALUES = 16
+
+# jump opcodes
+JUMPS = ("JMP", "JNZ", "JZE")
+
+# flags written by the arithmetic and logic opcodes
+WRITES = {
+    "ADC": "NZOC", "SHR": "NZC", "SHL": "NZC",
+    "AND": "NZ", "IOR": "NZ", "EOR": "NZ",
+    }
+
+# opcodes reading the carry
+CARRY = ("ADC", "SHR", "SHL")
+
+# STATUS resources: the flags and the other bits (S)
+STATUS = frozenset("NZOCS")
+
+# ---- ---- ---- ---- values
+
+# at most VALUES constants (None: unknown)
+def bound(V):
+    if V is None: return None
+    V = frozenset(V)
+    return V if len(V) <= VALUES else None
+
+# values of f over all the combinations of the values V
+def apply(f, *V):
+    if any(v is None for v in V): return None
+    n = 1
+    for v in V: n *= len(v)
+    if n > VALUES**3: return None
+    return [f(*x) for x in product(*V)]
+
+# join the states a and b: register values and copies
+def join(a, b):
+    s = {}
+    for r, (v, c) in a.items():
+        w, k = b[r]
+        s[r] = (None if v is None or w is None else bound(v | w),
+            c if c == k else None)
+    return s
+
+# result and STATUS of the arithmetic or logic opcode o
+# on x, y with STATUS s (as the engine computes them)
+def alu(E, o, x, y, s):
+    M, H, c = E.MSK, E.MSB, s & 1
+    if o == "ADC":
+        z = x + y + c
+        C, z = z >> E.CFG['BITS'] & 1, z & M
+    elif o == "SHR": z, C = (x >> 1) + (H if c else 0), x & 1
+    elif o == "SHL": z, C = (x << 1 & M) + (1 if c else 0), x & H > 0
+    elif o == "AND": z, C = x & y, 0
+    elif o == "IOR": z, C = x | y, 0
+    else: z, C = x ^ y, 0
+    # flags (see engine.flush)
+    m = sum(E.FLAGS[f] for f in WRITES[o])
+    f = (4 if z == 0 else 0) | (8 if z & H else 0)
+    if m & 1 and C: f |= 1
+    if m & 2 and (x ^ z) & (y ^ z) & H: f |= 2
+    return z, s & ~m | f
+
+# values of the operand op in the state st
+def value(E, op, st):
+    k = op[0]
+    if k == "IMM": return frozenset((op[1],))
+    if k == "LBL": return frozenset((E.lblval(op),))
+    if k == "LIN": return frozenset((E.target(op[1]),))
+    if k == "REG": return st[op[1]][0]
+    if k == "RLS":
+        W = [E.CB**i for i in range(len(op[1]))]
+        V = apply(lambda *x: sum(a*w for a, w in zip(x, W)),
+            *(st[r][0] for r in op[1]))
+        return None if V is None else bound(V)
+    # memory
+    return None
+
+# the line d failed to decode or allocates memory: the
+# processing stops there with an error
+def stops(E, d):
+    return d.opc == "MEM" or d.fn is type(E).opERR
+
+# ---- ---- ---- ---- forward pass
+
+# state after the line d from the state st
+def transfer(E, d, st):
+    o = d.opc
+    if stops(E, d) or not (o == "XFR" or o in WRITES): return st
+    # memory written
+    if d.dst[0] != "REG": return st
+    st, r = dict(st), d.dst[1]
+    if o == "XFR":
+        v, c = value(E, d.src, st), None
+        # copy of a register (of the register it copies)
+        if d.src[0] == "REG" and not "STATUS" in (r, d.src[1]):
+            c = st[d.src[1]][1] or d.src[1]
+            if c == r: c = None
+    else:
+        X, S = st[r][0], st["STATUS"][0]
+        Y = frozenset((0,)) if d.src is None else value(E, d.src, st)
+        P = apply(lambda x, y, s: alu(E, o, x, y, s), X, Y, S)
+        if P is None:
+            v = None
+            # the logic results do not depend on STATUS
+            if o not in CARRY:
+                Z = apply(lambda x, y: alu(E, o, x, y, 0)[0], X, Y)
+                v = None if Z is None else bound(Z)
+            st["STATUS"] = (None, None)
+        else:
+            v = bound(p[0] for p in P)
+            st["STATUS"] = (bound(p[1] for p in P), None)
+        c = None
+    # copies of r are lost
+    for k, (w, b) in st.items():
+        if b == r: st[k] = (w, None)
+    st[r] = (v, c)
+    return st
+
+# a conditional jump on the Z flag of the state st can
+# be taken, can continue
+def branches(d, st):
+    S = st["STATUS"][0]
+    if d.opc == "JMP": return True, False
+    if S is None: return True, True
+    Z = {s & 4 > 0 for s in S}
+    t = d.opc == "JZE"
+    return t in Z, (not t) in Z
+
+# next lines of the line d in the state st (the end of
+# code is len(dl))
+def successors(E, d, st):
+    n = len(E.dl)
+    if stops(E, d): return []
+    if not d.opc in JUMPS: return [d.nx]
+    taken, cont = branches(d, st)
+    L = [d.nx] if cont else []
+    if taken:
+        T = value(E, d.dst, st)
+        if T is None: T = range(n)
+        L += [t if 0 <= t < n else n for t in T]
+    return L
+
+# the states before each reachable line and the next
+# lines of each line
+def analyse(E):
+    n = len(E.dl)
+    IN, SU = {0: {r: (None, None) for r in E.RN}}, {}
+    W = [0]
+    while W:
+        i = W.pop()
+        d = E.dl[i]
+        st = transfer(E, d, IN[i])
+        SU[i] = successors(E, d, IN[i])
+        for j in SU[i]:
+            if j == n: continue
+            s = st if j not in IN else join(IN[j], st)
+            if j in IN and s == IN[j]: continue
+            IN[j] = s
+            W.append(j)
+    return IN, SU
+
+# ---- ---- ---- ---- backward pass
+
+# resources (registers and flags) of the registers R
+def resources(R):
+    u = set()
+    for r in R:
+        if r == "STATUS": u |= STATUS
+        else: u.add(r)
+    return u
+
+# registers of the operand op
+def registers(op):
+    if op is None: return ()
+    if op[0] == "REG": return (op[1],)
+    if op[0] in ("RLS", "MEM"): return op[1]
+    return ()
+
+# resources read and written by the line d
+def effects(E, d):
+    o = d.opc
+    # the processing stops: everything is read
+    if stops(E, d): return resources(E.RN), set()
+    if o == "DSP": return resources(registers(d.src)), set()
+    if o in JUMPS:
+        u = resources(registers(d.dst))
+        if o != "JMP": u.add("Z")
+        return u, set()
+    if o == "XFR":
+        u = resources(registers(d.src))
+        if d.dst[0] != "REG": return u | resources(registers(d.dst)), set()
+        return u, resources(registers(d.dst))
+    if o in WRITES:
+        u = resources(registers(d.dst)) | resources(registers(d.src))
+        if o in CARRY: u.add("C")
+        return u, set(WRITES[o]) | resources(registers(d.dst))
+    return set(), set()
+
+# resources read after each line (everything is read at
+# the end of code)
+def liveness(E, SU):
+    n, A = len(E.dl), resources(E.RN)
+    P = {i: [] for i in SU}
+    for i, L in SU.items():
+        for j in L:
+            if j != n: P[j].append(i)
+    U = {i: effects(E, E.dl[i]) for i in SU}
+    LI, LO = {i: set() for i in SU}, {}
+    W = list(SU)
+    while W:
+        i = W.pop()
+        o = set()
+        for j in SU[i]: o |= A if j == n else LI[j]
+        LO[i] = o
+        u, k = U[i]
+        l = u | (o - k)
+        if l != LI[i]:
+            LI[i] = l
+            W.extend(P[i])
+    return LO
+
+# ---- ---- ---- ---- rewriting
+
+# remove the line d
+def remove(d):
+    d.opc, d.dst, d.src, d.nf = "NOC", None, None, False
+    d.rx, d.rd, d.wr = None, None, None
+    return
+
+# the only value of V (None if there is none)
+def single(V):
+    if V is None or len(V) != 1: return None
+    return next(iter(V))
+
+# optimize the program loaded into the engine E, returns
+# the counts of each change
+def optimize(E):
+    dl, n = E.dl, len(E.dl)
+    K = dict.fromkeys(("unreachable", "jumps", "constants",
+        "copies", "transfers", "dead", "folded", "flags"), 0)
+    IN, SU = analyse(E)
+    # forward rewriting
+    for i, d in enumerate(dl):
+        if d.opc == "NOC" or stops(E, d): continue
+        if i not in IN:
+            remove(d)
+            K["unreachable"] += 1
+            continue
+        st = IN[i]
+        # jumps
+        if d.opc in JUMPS:
+            taken, cont = branches(d, st)
+            if not taken:
+                remove(d)
+                K["jumps"] += 1
+                continue
+            if not cont and d.opc != "JMP":
+                d.opc = "JMP"
+                K["jumps"] += 1
+            t = single(value(E, d.dst, st))
+            if d.dst[0] == "RLS" and t is not None:
+                d.dst = ("IMM", t)
+                K["jumps"] += 1
+            continue
+        # register sources (DSP keeps the register name)
+        if d.src is not None and d.src[0] == "REG" and d.opc != "DSP":
+            v, c = st[d.src[1]]
+            if single(v) is not None:
+                d.src = ("IMM", single(v))
+                K["constants"] += 1
+            elif c is not None:
+                d.src = ("REG", c)
+                K["copies"] += 1
+        # transfer of the value held
+        if d.opc == "XFR" and d.dst[0] == "REG" and d.dst[1] != "STATUS":
+            r = d.dst[1]
+            if d.src[0] == "REG":
+                s = d.src[1]
+                same = (st[r][1] or r) == (st[s][1] or s)
+            else:
+                v = single(value(E, d.src, st))
+                same = v is not None and v == single(st[r][0])
+            if same:
+                remove(d)
+                K["transfers"] += 1
+    # results never read (removing a line can make the
+    # lines it reads dead)
+    while True:
+        LO, k = liveness(E, SU), 0
+        for i in SU:
+            d = dl[i]
+            if stops(E, d) or not (d.opc == "XFR" or d.opc in WRITES):
+                continue
+            if d.dst[0] != "REG": continue
+            if d.src is not None and d.src[0] in ("MEM", "ADR"): continue
+            if effects(E, d)[1] & LO[i]: continue
+            remove(d)
+            k += 1
+        K["dead"] += k
+        if not k: break
+    # flags never read
+    for i in SU:
+        d = dl[i]
+        if stops(E, d) or not d.opc in WRITES: continue
+        if set(WRITES[d.opc]) & LO[i]: continue
+        # (a memory source is never constant)
+        z = single(transfer(E, d, IN[i])[d.dst[1]][0])
+        if z is not None:
+            d.opc, d.src = "XFR", ("IMM", z)
+            K["folded"] += 1
+        else:
+            d.nf = True
+            K["flags"] += 1
+    # skip the removed lines
+    E.skipLines()
+    for d in dl:
+        if d.opc in JUMPS and d.dst is not None and d.dst[0] == "IMM":
+            t = d.dst[1]
+            if 0 <= t < n and dl[t].opc == "NOC": d.dst = ("IMM", dl[t].nx)
+    # handlers and operands access
+    for d in dl:
+        if d.fn is type(E).opERR: continue
+        d.fn = E.handler(d.opc, d.nf)
+        E.bind(d)
+    # done
+    return K
+
+# ---- ---- ---- ---- verification
+
+# load the code s into two engines of class X, without
+# and with optimization, and run both: returns the
+# differences of their final positions, registers and
+# memory (none when they agree) and their cycles counts
+# (None if the code fails to load)
+def verify(X, s, cfg = "./engine.cfg", options = {}):
+    R = []
+    for k in (0, 1):
+        E = X([], cfg, {**options,
+            'CONSOLE': -1, 'LOGLEVEL': -1, 'OPTIMIZE': k})
+        if not E.load(s): return None
+        E.processCode()
+        R.append(E)
+    A, B = R
+    D = []
+    if A.ip != B.ip:
+        D.append(f"stopped at line {A.ip}, optimized at line {B.ip}")
+    for r, x, y in zip(A.RN, A.S.R, B.S.R):
+        if x != y: D.append(f"{r}: {x}, optimized {y}")
+    for a, (x, y) in enumerate(zip(A.S.MM, B.S.MM)):
+        if x != y: D.append(f"[{a}]: {x}, optimized {y}")
+    return D, A.cc, B.cc
+
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+    from sys import exit
+    from batch import BACKENDS
+
+    ap = ArgumentParser(description = __doc__.split("\n\n")[0])
+    ap.add_argument("file")
+    ap.add_argument("-c", default = "./engine.cfg", help = "configuration")
+    ap.add_argument("-b", default = "interpreter", choices = BACKENDS)
+    ap.add_argument("-m", type = int, default = None, help = "cycles limit")
+    ap.add_argument("-v", action = "store_true", help = "verify")
+    a = ap.parse_args()
+
+    m, c = BACKENDS[a.b]
+    engine = getattr(__import__(m), c)
+    s = open(a.file).read()
+    O = {} if a.m is None else {'CYCLEMAX': a.m}
+    # changes
+    E = engine([], a.c, {**O, 'CONSOLE': -1, 'LOGLEVEL': -1, 'OPTIMIZE': 0})
+    if not E.load(s):
+        print(f"{a.file}: load failed")
+        exit(1)
+    for k, v in optimize(E).items(): print(f"{k:>12} {v}")
+    # verification
+    if a.v:
+        D, ca, cb = verify(engine, s, a.c, O)
+        for l in D: print(l)
+        print(f"{'same' if not D else 'different'} final state, " \
+            f"cycles {ca} optimized {cb}")
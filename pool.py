@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+# file: pool.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+A pool of engines loaded with the same program. An
+engine taken from the pool is ready to run: freshly
+loaded or reset after its previous run. Repeated runs
+of a program with different inputs then pay for the
+configuration, the log file and the loading only once
+per engine.
+"""
+
+# standard modules
+from contextlib import contextmanager
+
+# local classes and functions
+from engine__004 import engine
+
+# the engine pool
+
+class pool():
+
+    """ Hand out engines of class E loaded with the code
+    s. The engines are created with the DEBUG, CONFIG and
+    OPTIONS arguments of the engine class (set LOGLEVEL to
+    -1 in OPTIONS to run without log file). n engines are
+    created in advance.
+    """
+
+    def __init__(self, s, n = 0, E = engine,
+            DEBUG = [], CONFIG = "./engine.cfg", OPTIONS = {}):
+        self.s, self.E, self.fl = s, E, []
+        self.args = (DEBUG, CONFIG, OPTIONS)
+        for i in range(n):
+            e = self.new()
+            if e is None: break
+            self.fl.append(e)
+        return
+
+    # new loaded engine (None if loading fails)
+    def new(self):
+        e = self.E(*self.args)
+        if not e.load(self.s): return None
+        return e
+
+    # take an engine from the pool
+    def get(self):
+        if self.fl: return self.fl.pop()
+        return self.new()
+
+    # return an engine to the pool
+    def put(self, e):
+        e.reset()
+        self.fl.append(e)
+        return
+
+    # take an engine for the duration of a with block
+    @contextmanager
+    def engine(self):
+        e = self.get()
+        try:
+            yield e
+        finally:
+            if e is not None: self.put(e)
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+# file: profiler.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Execution profile report. With PROFILE set in the
+configuration, the engine counts for each line how
+many times it was executed, the cycles it consumed
+and (with PROFILETIME) the time spent in its handler,
+and it counts the backward jumps taken. The report
+written to the PROFILE file lists the totals per
+opcode, the hottest loops and the source annotated
+with the counts of each line.
+"""
+
+# number of loops listed
+LOOPS = 10
+
+# write the profile report of engine E to the file fn:
+# N, C, T are the counts, cycles and times (ns) of each
+# line and J the counts of the backward jumps (a, b)
+# from line a to line b
+def report(E, fn, N, C, T, J):
+    L = []
+    # totals
+    tc, tn, tt = sum(C), sum(N), sum(T)
+    L.append(f"# profile of {len(E.il)-1} lines")
+    L.append(f"executed lines {tn}, cycles {tc}")
+    if tt: L.append(f"handlers time {tt/1e6:.3f} ms")
+    # opcodes
+    O = {}
+    for d, n, c, t in zip(E.dl, N, C, T):
+        if not n: continue
+        o = O.setdefault(d.opc, [0, 0, 0])
+        o[0], o[1], o[2] = o[0]+n, o[1]+c, o[2]+t
+    L.append("\nopcodes:")
+    L.append(f" opc {'count':>10} {'cycles':>10} {'%':>6}" +
+        (f" {'ms':>10}" if tt else ""))
+    for k, (n, c, t) in sorted(O.items(), key = lambda x: -x[1][1]):
+        s = f" {k} {n:10} {c:10} {100*c/max(tc, 1):6.1f}"
+        if tt: s += f" {t/1e6:10.3f}"
+        L.append(s)
+    # loops: cycles of the lines between target and jump
+    H = []
+    for (a, b), n in J.items():
+        H.append((sum(C[b:a+1]), n, b, a))
+    H.sort(reverse = True)
+    L.append("\nhot loops:")
+    L.append(f" {'lines':>11} {'taken':>10} {'cycles':>10} {'%':>6}")
+    for c, n, b, a in H[:LOOPS]:
+        L.append(f" {b:04} - {a:04} {n:10} {c:10} {100*c/max(tc, 1):6.1f}")
+    # annotated source
+    L.append("\nsource:")
+    L.append(f" {'count':>10} {'cycles':>10}" +
+        (f" {'us':>10}" if tt else "") + "  line")
+    for i in range(1, len(E.il)):
+        n, c, t = N[i], C[i], T[i]
+        s = f" {n:10} {c:10}" if n else f" {'':10} {'':10}"
+        if tt: s += f" {t/1e3:10.1f}" if n else f" {'':10}"
+        L.append(f"{s}  {i:04} {E.il[i]}")
+    # write
+    with open(fn, 'w') as fh: fh.write("\n".join(L) + "\n")
+    return
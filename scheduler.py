@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+# file: scheduler.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Run many engines in one asyncio event loop. Each engine
+runs its program in steps of a number of cycles (a slice)
+and gives way to the other tasks of the loop after each
+step: a long program does not hold up the others. A run
+can be limited by a cycles budget and by a wall-clock
+deadline.
+
+usage: scheduler.py [-c cfg] [-b backend] [-s slice]
+                    [-n budget] [-t deadline] files
+"""
+
+# standard modules
+from time import monotonic
+import asyncio
+
+# cycles per slice
+SLICE = 10000
+
+# how the engine E stopped after its last step
+def ending(E):
+    cm = E.CFG['CYCLEMAX']
+    if E.ip >= len(E.il): return "code"
+    if cm and E.cc > cm: return "cycles"
+    if E.IW is not None: return "input"
+    if E.why and E.bk == (E.ip, E.cc): return "break"
+    return "error"
+
+# run the loaded engine E from its stop position in steps
+# of n cycles, for at most budget cycles and deadline
+# seconds (0 and None: no limit). A step waiting for an
+# input port (see ioport) is taken again when the input
+# arrives. Returns how the run ended: "code", "error",
+# "cycles" (CYCLEMAX), "break" (breakpoint or watchpoint),
+# "budget" or "deadline".
+async def drive(E, n = SLICE, budget = 0, deadline = None):
+    cb = E.cc + budget if budget else None
+    t = None if deadline is None else monotonic() + deadline
+    while True:
+        k = n if cb is None else min(n, cb - E.cc)
+        if k < 1: return "budget"
+        if not E.step(k):
+            if E.IW is None: return ending(E)
+            # wait for the input
+            try:
+                w = None if t is None else max(t - monotonic(), 0)
+                await asyncio.wait_for(E.IW.wait(), w)
+            except asyncio.TimeoutError:
+                return "deadline"
+            continue
+        # give way to the other tasks
+        await asyncio.sleep(0)
+        if t is not None and monotonic() > t: return "deadline"
+
+# run the loaded engines together, returns their endings
+async def gather(engines, n = SLICE, budget = 0, deadline = None):
+    return await asyncio.gather(
+        *(drive(E, n, budget, deadline) for E in engines))
+
+if __name__ == "__main__":
+
+    from argparse import ArgumentParser
+    from batch import BACKENDS
+
+    ap = ArgumentParser(description = __doc__.split("\n\n")[0])
+    ap.add_argument("files", nargs = "+")
+    ap.add_argument("-c", default = "./engine.cfg", help = "configuration")
+    ap.add_argument("-b", default = "interpreter", choices = BACKENDS)
+    ap.add_argument("-s", type = int, default = SLICE, help = "slice")
+    ap.add_argument("-n", type = int, default = 0, help = "budget")
+    ap.add_argument("-t", type = float, default = None, help = "deadline")
+    a = ap.parse_args()
+
+    m, c = BACKENDS[a.b]
+    engine = getattr(__import__(m), c)
+    L = []
+    for fp in a.files:
+        E = engine([], a.c, {'CONSOLE': -1, 'LOGLEVEL': -1})
+        if E.load(open(fp).read()): L.append((fp, E))
+        else: print(f"{fp}: load failed")
+    R = asyncio.run(gather([E for fp, E in L], a.s, a.n, a.t))
+    for (fp, E), r in zip(L, R):
+        print(f"{fp}: {r} at line {E.ip}, cycle {E.cc}")
@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+# file: test_linker.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Linked programs end with the last line of the main unit.
+"""
+
+# standard modules
+from os import path
+
+# local classes and functions
+from engine__004 import engine
+from linker import loadFiles
+
+# configuration file next to this file
+CFG = path.join(path.dirname(path.abspath(__file__)), "engine.cfg")
+
+def test_end_of_main(tmp_path):
+    fm, fu = tmp_path / "main.machine", tmp_path / "loop.machine"
+    fm.write_text("xfr r1 1\n# end\n")
+    fu.write_text("again: adc r1 1\njmp again\n")
+    E = engine([], CFG, {
+        'CYCLEMAX': 100, 'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': ''})
+    assert loadFiles(E, [str(fm), str(fu)])
+    E.processCode()
+    # the unit is never entered
+    assert E.ip == len(E.il) and E.cc == 1
+    assert E.S.R[E.RI['R1']] == 1
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+# file: test_scheduler.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Steps and budgets run exactly the cycles requested.
+"""
+
+# standard modules
+from os import path
+import asyncio
+
+# local classes and functions
+from engine__004 import engine
+from scheduler import drive
+
+# configuration file next to this file
+CFG = path.join(path.dirname(path.abspath(__file__)), "engine.cfg")
+
+def loop(cm = 0):
+    E = engine([], CFG, {
+        'CYCLEMAX': cm, 'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': ''})
+    assert E.load("loop: xfr r1 1\njmp loop\n")
+    return E
+
+def test_budget():
+    for n, b in ((7, 100), (1, 5), (100, 100)):
+        E = loop()
+        assert asyncio.run(drive(E, n, b)) == "budget"
+        assert E.cc == b
+
+def test_steps():
+    E = loop()
+    assert all(E.step(1) for k in range(3))
+    assert E.cc == 3
+
+def test_cyclemax():
+    E = loop(5)
+    assert not E.step(100) and E.cc == 6
+    # nothing runs once CYCLEMAX is reached
+    assert not E.step(100) and E.cc == 6
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+# file: test_snapshot.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Snapshots copy the pages written and restore the memory.
+"""
+
+# standard modules
+from os import path
+
+# local classes and functions
+from engine__004 import engine
+from compiler import compiler
+
+# configuration file next to this file
+CFG = path.join(path.dirname(path.abspath(__file__)), "engine.cfg")
+
+# fill the 1000 words from address 600
+CODE = """
+        jmp start
+buf:    mem 2000
+start:  xfr r1 600
+        xfr r2 1000
+fill:   xfr [r1] r2
+        xfr status 0
+        adc r1 1
+        xfr status 0
+        adc r2 -1
+        jnz fill
+"""
+
+def run(K, bits):
+    E = K([], CFG, {
+        'BITS': bits, 'CYCLEMAX': 0,
+        'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': ''})
+    assert E.load(CODE)
+    return E
+
+def check(K, bits):
+    E = run(K, bits)
+    s0 = E.snapshot()
+    E.step(600)
+    s1, M1 = E.snapshot(), list(E.S.MM)
+    # only the pages written are copied
+    assert [k for k, (p, q) in enumerate(zip(s0.pages, s1.pages))
+        if p is not q] == [2]
+    E.processLines(E.ip, E.cc)
+    M2 = list(E.S.MM)
+    # back to the middle, then the end again
+    assert E.restore(s1) and list(E.S.MM) == M1
+    E.processLines(E.ip, E.cc)
+    assert list(E.S.MM) == M2
+    # back to the start
+    assert E.restore(s0) and not any(E.S.MM)
+
+def test_interpreter():
+    for bits in (16, 72): check(engine, bits)
+
+def test_compiler():
+    for bits in (16, 72): check(compiler, bits)
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+# file: test_tracefile.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Binary trace records and their text.
+"""
+
+# standard modules
+from os import path
+
+# local classes and functions
+from engine__004 import engine
+from tracefile import records, formatter
+
+# configuration file next to this file
+CFG = path.join(path.dirname(path.abspath(__file__)), "engine.cfg")
+
+def trace(tmp_path, bits, code):
+    fn = str(tmp_path / "trace.bin")
+    E = engine([], CFG, {
+        'BITS': bits, 'TRACEFILE': fn, 'CYCLEMAX': 0,
+        'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': ''})
+    assert E.load(code)
+    E.processCode()
+    return records(fn)
+
+def test_status_16_bits(tmp_path):
+    P, it = trace(tmp_path, 16, "xfr status 300\nxfr r1 5\n")
+    L = list(it)
+    assert P['bits'] == 16 and len(L) == 2
+    # STATUS written, then recorded with the next line
+    assert L[0][5] == 300 and L[0][6] == 300
+    assert L[1][5] == 5 and L[1][6] == 300
+
+def test_status_wide(tmp_path):
+    P, it = trace(tmp_path, 72, "xfr status 0x1000000000000000f\n")
+    L = list(it)
+    assert L[0][6] == 0x1000000000000000f
+
+def test_trace_and_profile(tmp_path):
+    fn, pf = str(tmp_path / "trace.bin"), tmp_path / "profile.txt"
+    E = engine([], CFG, {
+        'BITS': 8, 'TRACEFILE': fn, 'PROFILE': str(pf), 'CYCLEMAX': 0,
+        'CONSOLE': -1, 'LOGLEVEL': -1, 'CACHEDIR': ''})
+    assert E.load("xfr r1 3\nloop: xfr status 0\nadc r1 -1\njnz loop\n")
+    E.processCode()
+    # both the trace and the profile are written
+    assert len(list(records(fn)[1])) == 10
+    assert "executed lines 10" in pf.read_text()
+
+def test_log_text(tmp_path):
+    # the text of the records is the text of the log traces
+    fn, lf = str(tmp_path / "trace.bin"), tmp_path / "trace.log"
+    E = engine(["opJMP", "opJNZ", "opXFR", "opADC", "opSHR", "opEOR"],
+        CFG, {'BITS': 8, 'TRACEFILE': fn, 'LOGFILE': str(lf),
+        'CYCLEMAX': 60, 'CONSOLE': -1, 'LOGLEVEL': 2, 'CACHEDIR': ''})
+    assert E.load("""
+        jmp start
+buf:    mem 4 = 1, 2, 3
+start:  xfr r7 start
+        xfr r1 buf
+        xfr r2 [r1]
+        xfr [r1] r7
+loop:   adc r2 [r1]
+        shr r2
+        eor r2 r7
+        dsp [r1]
+        jnz loop
+""")
+    E.processCode()
+    E.closeLog()
+    P, it = records(fn)
+    F = formatter(P)
+    T = [F.text(r) for r in it]
+    L = [l for l in lf.read_text().split("\n") if l[:2] == " 0"]
+    assert len(T) > 10 and T == L
@@ -0,0 +1,232 @@
+#!/usr/bin/python3
+# file: tracefile.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+Binary execution traces. With TRACEFILE set in the
+configuration, the engine appends one fixed size record
+per executed line to a buffer written to that file: the
+line, the cycle count, the opcode, the destination, the
+value, the STATUS register, the destination value before
+the line and the source value. No text is built while
+running; the formatter below renders the records after
+the run as the lines the engine traces in the log.
+
+usage: tracefile.py trace [first [last]]
+"""
+
+# standard modules
+from struct import Struct
+import pickle
+
+# file signature (version 3: operands and values read)
+MAGIC = b"MTR3"
+
+# header: signature, bits, length of the program description
+HEAD = Struct("<4sHI")
+
+# destination kinds
+NONE, REG, MEM, LIN = 0, 1, 2, 3
+
+# record fields: line, cycles, opcode number, destination
+# kind, destination, value, STATUS, destination before and
+# source values (the words are byte strings when they are
+# wider than 64 bits)
+def recordtype(bits):
+    if bits <= 64: return Struct("<IQBBQQQQQ")
+    w = (bits+7)//8
+    return Struct(f"<IQBBQ{w}s{w}s{w}s{w}s")
+
+# trace writer
+
+class recorder():
+
+    """ Pack records into a buffer written to the file
+    fn once size bytes are collected. The header holds
+    the words width and the program description P needed
+    to read and format the records: opcode and register
+    names, operands of each line, labels, memory map and
+    registers at the start of the trace.
+    """
+
+    def __init__(self, fn, bits, P, size = 1<<16):
+        self.fh, self.size = open(fn, 'wb'), size
+        self.RT, self.bf = recordtype(bits), bytearray()
+        # wide values are stored as bytes
+        self.W = (bits+7)//8 if bits > 64 else 0
+        # header
+        s = pickle.dumps(P)
+        self.fh.write(HEAD.pack(MAGIC, bits, len(s)) + s)
+        return
+
+    def write(self, ip, cc, op, k, a, v, st, x, y):
+        if self.W:
+            v, st, x, y = (
+                w.to_bytes(self.W, "little") for w in (v, st, x, y))
+        self.bf += self.RT.pack(ip, cc, op, k, a, v, st, x, y)
+        if len(self.bf) >= self.size: self.flush()
+        return
+
+    def flush(self):
+        self.fh.write(self.bf)
+        self.bf = bytearray()
+        self.fh.flush()
+        return
+
+    def close(self):
+        self.flush()
+        self.fh.close()
+        return
+
+# trace reader
+
+def records(fn):
+    """ Return the program description (with the words
+    width under 'bits') and an iterator over the records
+    of the trace file fn.
+    """
+    fh = open(fn, 'rb')
+    b = fh.read(HEAD.size)
+    m, bits, n = HEAD.unpack(b) if len(b) == HEAD.size else (b, 0, 0)
+    if m != MAGIC:
+        fh.close()
+        return None
+    P = pickle.loads(fh.read(n))
+    P['bits'] = bits
+    RT = recordtype(bits)
+    def it():
+        with fh:
+            while True:
+                b = fh.read(RT.size*4096)
+                if not b: return
+                for r in RT.iter_unpack(b):
+                    if bits > 64:
+                        r = r[:5] + tuple(
+                            int.from_bytes(x, "little") for x in r[5:])
+                    yield r
+    return P, it()
+
+# status register formatting (flags NZOC)
+def flagfm(s):
+    return "".join(f if s & w else "." for f, w in zip("NZOC", (8, 4, 2, 1)))
+
+# trace formatter
+
+class formatter():
+
+    """ Render the records of a trace as the engine traces
+    the lines in the log (see the op... debug flags). The
+    registers are followed from their values at the start
+    of the trace through the records, in order.
+    """
+
+    def __init__(self, P):
+        self.P, self.bits = P, P['bits']
+        self.R = list(P['start'])
+        self.RI = {r: i for i, r in enumerate(P['registers'])}
+        self.MSB, self.CB = 1 << (self.bits-1), 1 << self.bits
+        return
+
+    # unsigned:signed value (see engine.usfm)
+    def usfm(self, x):
+        return f"{x}:{x - self.CB if x & self.MSB else x}"
+
+    # label value (see engine.lblfm)
+    def lblfm(self, op):
+        k, r, o, j = op
+        ml, ll = self.P['memory'], self.P['labels']
+        if r in ml:
+            v = ml[r]
+            m = f"{r}:{v}"
+            if o is not None: m = f"({m}+{o}):{v+o}"
+        else:
+            m = f"{r}:{ll[r]}"
+        if j is not None: m = f"{m} ${j}"
+        return m
+
+    # memory address (see engine.adrfm)
+    def adrfm(self, op):
+        if op[0] == "MEM":
+            R, I = self.R, self.RI
+            return f"[{', '.join(f'{r}:{R[I[r]]}' for r in op[1])}]"
+        a = op[1]
+        if a[0] == "IMM": return f"[{a[1]}]"
+        return f"[{self.lblfm(a)}]"
+
+    # source operand (see engine.srcfm)
+    def srcfm(self, op, v):
+        k = op[0]
+        if k == "REG": return f"{op[1]}:{v}"
+        if k == "LBL": return self.lblfm(op)
+        if k == "MEM": return f"{self.adrfm(op)}:{v}"
+        return f"{v}"
+
+    # jump destination (see engine.jmpfm)
+    def jmpfm(self, op, v):
+        if op[0] == "LIN": v = self.P['labels'][op[1]]
+        if op[0] == "RLS": return f"[{', '.join(op[1])}]:{v}"
+        return f"{op[1]}:{v}"
+
+    # text of the record r
+    def text(self, r):
+        ip, cc, op, k, a, v, st, x, y = r
+        h, o = f" {ip:04}  {cc:06}  ", self.P['opcodes'][op]
+        dst, src = self.P['lines'][ip]
+        # carry before the line
+        C = self.R[0] & 1
+        if o == "NOP": t = f"{h}NOP"
+        elif k == LIN:
+            t = f"{h}{o} to {self.jmpfm(dst, a)}" if v else f"{h}{o} continue"
+        elif o == "DSP":
+            if src[0] != "REG": t = f"{h}{self.adrfm(src)}:{self.usfm(v)}"
+            elif src[1] == "STATUS": t = f"{h}STATUS:{flagfm(v)}"
+            else: t = f"{h}{src[1]}:{self.usfm(v)}"
+        elif o == "XFR":
+            if dst[0] == "REG": m = f"{dst[1]} = {self.srcfm(src, y)}"
+            else: m = f"{self.adrfm(dst)} = {src[1]}:{y}"
+            t = f"{h}{m} = {self.usfm(v)}"
+        elif o == "ADC":
+            t = f"{h}{dst[1]} = {dst[1]}:{x} + {self.srcfm(src, y)}" \
+                f" + C:{C} = {self.usfm(v)}"
+        elif o in ("SHR", "SHL"):
+            s, c = (">>", self.MSB) if o == "SHR" else ("<<", 1)
+            t = f"{h}{dst[1]} = {s} {dst[1]}:{x} + C:{c if C else 0}" \
+                f" = {self.usfm(v)}"
+        elif o in ("AND", "IOR", "EOR"):
+            s = {"AND": "&", "IOR": "v", "EOR": "^"}[o]
+            t = f"{h}{dst[1]} = {dst[1]}:{x} {s} " \
+                f"{self.srcfm(src, y)} = {self.usfm(v)}"
+        else:
+            t = f"{h}{o}"
+        # registers after the line
+        if k == REG: self.R[a] = v
+        self.R[0] = st
+        return t
+
+if __name__ == "__main__":
+
+    from sys import argv, exit
+
+    if len(argv) < 2:
+        print(__doc__.split("usage: ")[1].strip())
+        exit(1)
+    # records range
+    i = int(argv[2]) if len(argv) > 2 else 0
+    j = int(argv[3]) if len(argv) > 3 else None
+    # read
+    t = records(argv[1])
+    if t is None:
+        print(f"{argv[1]}: not a trace file")
+        exit(1)
+    P, it = t
+    F = formatter(P)
+    # format (the registers are followed from the first
+    # record, stop quietly when piped into head)
+    try:
+        for n, r in enumerate(it):
+            if j is not None and n >= j: break
+            s = F.text(r)
+            if n >= i: print(s)
+    except BrokenPipeError:
+        pass
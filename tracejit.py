@@ -0,0 +1,138 @@
+#!/usr/bin/python3
+# file: tracejit.py
+# created: 18 October 2026
+# author: Roch Schanen
+
+"""
+A tracing just-in-time compiler on top of the
+interpreter. Backward jumps are counted; once a loop
+head is hot, the lines executed around the loop are
+recorded and compiled into a python function that
+repeats the loop as long as every branch goes the
+recorded way. A branch going the other way exits
+the trace and the interpreter takes over again.
+"""
+
+# local classes and functions
+from engine__004 import engine
+from compiler import codegen
+
+# jump opcodes
+JUMPS = ("JMP", "JNZ", "JZE")
+
+# the tracing engine
+
+class tracejit(engine):
+
+    # number of backward jumps before a loop is recorded
+    HOT = 64
+
+    # longest trace recorded (lines)
+    TRACEMAX = 1024
+
+    # backward jumps counts and compiled traces, with and
+    # without cycles limit (kept across processing and reset)
+    TR = None
+
+    # compile a recorded trace: a list of (line, next line)
+    # pairs starting at the loop head and jumping back to it
+    # (with the cycles limit checks when lim is set)
+    def compileTrace(self, T, lim):
+        # code generator, cycles limit, tab
+        cg, cm, tab = codegen(self), lim, " "*8
+        # function header: load registers
+        S = ["def trace(cc, cm):"]
+        S.extend(cg.load("    "))
+        S.append("    while True:")
+        # body
+        for ip, nx in T:
+            d = self.dl[ip]
+            if d.opc in JUMPS:
+                S.append(f"{tab}cc += 1")
+                # actual next line
+                t = cg.rd(d.dst)
+                if d.opc == "JZE": t = f"{t} if R_STATUS & 4 else {d.nx}"
+                if d.opc == "JNZ": t = f"{d.nx} if R_STATUS & 4 else {t}"
+                # guard (static jumps always go the recorded way)
+                if not (d.opc == "JMP" and d.dst[0] in ("LIN", "IMM")):
+                    S.append(f"{tab}t = {t}")
+                    S.append(f"{tab}if t != {nx}: ip = t; break")
+                s = ["cc += 1"]
+            else:
+                s = cg.emit(d, ip)
+                for l in s: S.append(f"{tab}{l}")
+            # cycles limit
+            if cm and "cc += 1" in s:
+                S.append(f"{tab}if cc > cm: ip = {nx}; break")
+        # save registers
+        S.extend(cg.save("    "))
+        S.append("    return ip, cc")
+        # done
+        return cg.build("\n".join(S) + "\n", "trace")
+
+    # process decoded lines, running hot loops as compiled traces
+    def processLines(self, ip, cc):
+        # traces and profiles need the interpreter
+        if self.interpreted():
+            return engine.processLines(self, ip, cc)
+        # release handlers (no opcode debug flag is set)
+        self.dispatch()
+        # cycles limit
+        cm = self.cyclemax()
+        # success
+        r = True
+        # decoded instructions, end of code
+        dl, n = self.dl, len(self.il)
+        # backward jumps counts, compiled traces, trace record
+        if self.TR is None: self.TR = {}
+        hot, tr = self.TR.setdefault(bool(cm), ({}, {}))
+        rec = None
+        # while successfull, continue processing
+        while r:
+            # compiled trace (not while recording)
+            f = tr.get(ip) if rec is None else None
+            if f is not None:
+                # flags are not lazy in compiled code
+                self.flush()
+                ip, cc = f(cc, cm)
+            else:
+                d = dl[ip]
+                # execute and display (the header is formatted
+                # by the handlers that display)
+                r, nx, cc = d.fn(self, d, ip, cc)
+                # interupt on failure
+                if not r:
+                    self.log(f"error while running code at line {nx-1}.")
+                    self.log(f"exiting...")
+                    self.flush()
+                    self.ip, self.cc = nx-1, cc
+                    return
+                # record trace until the loop closes
+                if rec is not None:
+                    rec.append((ip, nx))
+                    if nx == rec[0][0]:
+                        tr[nx], rec = self.compileTrace(rec, bool(cm)), None
+                    elif len(rec) > self.TRACEMAX:
+                        rec = None
+                # count backward jumps
+                elif nx < ip and d.opc in JUMPS:
+                    hot[nx] = hot.get(nx, 0) + 1
+                    if hot[nx] == self.HOT and nx not in tr:
+                        rec = []
+                ip = nx
+            # break on last instruction
+            if ip == n:
+                self.log(f"\nreached end of code.")
+                r = False
+            # break on limit reached
+            if cm:
+                if cc > cm:
+                    if cm == self.CFG['CYCLEMAX']:
+                        self.log(f"\n\nreached end of cycles.")
+                    r = False
+        # write pending flags
+        self.flush()
+        # stop position
+        self.ip, self.cc = ip, cc
+        # done
+        return